@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+# Serves the recipe views' async variants, see recipe.async_views.
+from recipe.async_views import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -82,15 +84,64 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql_pool',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Connections per process, see core.backends.postgresql_pool.
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 1800)
+            ),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'HEALTH_CHECK_IDLE': float(
+                os.environ.get('DB_POOL_HEALTH_CHECK_IDLE', 5)
+            ),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The recipe cache holds rendered anonymous recipe reads. Writes invalidate
+# it by replacing version tokens stored in it, so every worker process must
+# share it: the default is a directory on the host, a local memory cache
+# would keep serving stale responses from the other workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        'BACKEND': os.environ.get(
+            'RECIPE_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.environ.get(
+            'RECIPE_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'recipe-cache'),
+        ),
+        'TIMEOUT': int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300)),
+    },
+}
+
+RECIPE_CACHE_ALIAS = 'recipes'
+
+# Limits on uploaded recipe images, checked while streaming and from the
+# PNG header respectively.
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_DIMENSION = int(
+    os.environ.get('RECIPE_IMAGE_MAX_DIMENSION', 8192)
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -131,6 +182,9 @@ STATIC_URL = '/static/static/'
 MEDIA_URL = '/static/media/'
 
 MEDIA_ROOT = '/vol/web/media'
+# Internal location the front proxy serves MEDIA_ROOT from. When set, media
+# responses carry X-Accel-Redirect instead of the file.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
 STATIC_ROOT = '/vol/web/static'
 
 # Default primary key field type
@@ -143,7 +197,7 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
 }
@@ -153,6 +207,33 @@ JWT_AUTH = {
     'JWT_EXPIRATION_DELTA': datetime.timedelta(days=1),  # Set your desired token expiration time
 }
 
+# Threads per process serving recipe reads under ASGI. Each holds its own
+# database connection.
+ASYNC_READ_THREADS = int(os.environ.get('ASYNC_READ_THREADS', 10))
+
+# Seconds an authenticated user is reused for without querying it, and how
+# many users each process keeps.
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 30))
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 10000))
+
+# Seconds between reloads of the revoked token list in each process, i.e.
+# how long a logged out access token may still work on other workers.
+AUTH_REVOCATION_SYNC_INTERVAL = int(
+    os.environ.get('AUTH_REVOCATION_SYNC_INTERVAL', 5)
+)
+
+# Processes hashing passwords for login and signup in each worker process,
+# and how many more requests may wait for one before getting a 503. Only
+# threaded or ASGI workers have more than one request waiting at a time.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 16))
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+
+SIMPLE_JWT = {
+    # Refreshing revokes the old refresh token and hands out a new one.
+    'ROTATE_REFRESH_TOKENS': True,
+}
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
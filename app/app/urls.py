@@ -20,9 +20,10 @@ from drf_spectacular.views import (
 
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from recipe import media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -33,10 +34,9 @@ urlpatterns = [
     ),
     path("api/user/", include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:name>',
+        media.serve,
+        name='media',
+    ),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT,
-    )
\ No newline at end of file
@@ -49,4 +49,5 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
-admin.site.register(models.Like)
\ No newline at end of file
+admin.site.register(models.Like)
+admin.site.register(models.RevokedToken)
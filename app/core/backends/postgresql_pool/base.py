@@ -0,0 +1,78 @@
+"""
+PostgreSQL backend reusing connections from a pool shared by the process.
+
+Set ``ENGINE`` to ``core.backends.postgresql_pool`` and tune the pool with
+a ``POOL`` dict beside the other connection settings, see POOL_DEFAULTS.
+Closing a connection, which Django does after every request while
+CONN_MAX_AGE is 0, hands it back to the pool instead.
+"""
+import functools
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from core.backends.postgresql_pool.creation import DatabaseCreation
+from core.backends.postgresql_pool.pool import ConnectionPool, get_pool
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 20,
+    # Seconds to wait for a connection when MAX_SIZE are in use.
+    'TIMEOUT': 10,
+    # Seconds before a connection is replaced.
+    'MAX_LIFETIME': 1800,
+    # Seconds before an idle connection beyond MIN_SIZE is closed.
+    'MAX_IDLE': 300,
+    # Seconds idle before a connection is checked on checkout.
+    'HEALTH_CHECK_IDLE': 5,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    def get_pool(self):
+        """The pool for this database, None for maintenance connections."""
+        if self.alias == NO_DB_ALIAS:
+            return None
+        params = self.get_connection_params()
+        key = (self.alias, tuple(sorted(
+            (name, str(value)) for name, value in params.items()
+        )))
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        return get_pool(key, lambda: ConnectionPool(
+            **{name.lower(): value for name, value in options.items()}
+        ))
+
+    def pool_stats(self):
+        pool = self._pool or self.get_pool()
+        return pool.stats() if pool is not None else None
+
+    def get_new_connection(self, conn_params):
+        pool = self._pool = self.get_pool()
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        # Sent on connect, so DISCARD ALL resets the encoding to it.
+        conn_params = {'client_encoding': 'UTF8', **conn_params}
+        connect = functools.partial(super().get_new_connection, conn_params)
+        pool.fill(connect)
+        connection = pool.checkout(connect)
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level,
+        )
+        return connection
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return super()._close()
+        if self.in_atomic_block:
+            # Django keeps using the closed connection until the block exits.
+            pool.discard(self.connection)
+        else:
+            pool.checkin(self.connection)
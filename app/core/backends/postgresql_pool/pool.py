@@ -0,0 +1,268 @@
+"""
+A thread-safe pool of psycopg2 connections shared by a process.
+"""
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Hand out connections, opening at most ``max_size`` of them.
+
+    Returned connections are cleared with ``DISCARD ALL``, so session
+    settings, temporary tables and open cursors don't leak between users.
+    Idle connections are reused most recently returned first. One is
+    replaced instead of reused once it has been open for ``max_lifetime``
+    seconds, or checked with ``SELECT 1`` after ``health_check_idle``
+    seconds unused. Idle connections beyond ``min_size`` are closed after
+    ``max_idle`` seconds.
+    """
+
+    def __init__(self, min_size=0, max_size=20, timeout=10,
+                 max_lifetime=1800, max_idle=300, health_check_idle=5):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.health_check_idle = health_check_idle
+        # A forked child must not use or close its parent's connections.
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        # (connection, returned_at) pairs, most recently returned last.
+        self._idle = []
+        self._opened_at = {}
+        self._size = 0
+        self._stats = dict.fromkeys([
+            'checkouts', 'waits', 'timeouts', 'health_check_failures',
+            'expired', 'opened', 'closed',
+        ], 0)
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def checkout(self, connect):
+        """Return an open connection, calling ``connect`` to open one."""
+        started = time.monotonic()
+        waited = False
+        while True:
+            conn, returned_at, waited_now = self._take(started + self.timeout)
+            waited = waited or waited_now
+            if conn is None:
+                conn = self._open(connect)
+                break
+            if self._healthy(conn, returned_at):
+                break
+
+        wait_time = time.monotonic() - started
+        with self._cond:
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+        if waited:
+            logger.debug('Waited %.3fs for a database connection.', wait_time)
+        return conn
+
+    def checkin(self, conn):
+        """Return ``conn``, closing it if it can't be reused."""
+        if os.getpid() != self.pid:
+            return
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError('connection already closed')
+            status = conn.info.transaction_status
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute('DISCARD ALL')
+        except psycopg2.Error:
+            self.discard(conn)
+            return
+
+        if self._expired(conn):
+            with self._cond:
+                self._stats['expired'] += 1
+            self.discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            stale = self._stale()
+            self._cond.notify()
+        for conn in stale:
+            self._close(conn)
+
+    def discard(self, conn):
+        """Close ``conn`` and free its slot."""
+        if os.getpid() != self.pid:
+            return
+        with self._cond:
+            self._forget(conn)
+            self._cond.notify()
+        self._close(conn)
+
+    def fill(self, connect):
+        """Open connections with ``connect`` until ``min_size`` are open."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self.checkin(self._open(connect))
+
+    def close(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._forget(conn)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Counters for monitoring, including time spent waiting."""
+        with self._cond:
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'wait_time': self._wait_time,
+                'max_wait_time': self._max_wait_time,
+            }
+
+    def _take(self, deadline):
+        """Pop an idle connection or reserve a slot for a new one (None).
+
+        Also returns when the idle connection was returned and whether the
+        call had to wait.
+        """
+        waited = False
+        expired = []
+        try:
+            with self._cond:
+                while True:
+                    while self._idle:
+                        conn, returned_at = self._idle.pop()
+                        if not self._expired(conn):
+                            return conn, returned_at, waited
+                        self._stats['expired'] += 1
+                        self._forget(conn)
+                        expired.append(conn)
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None, waited
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        self._stats['timeouts'] += 1
+                        break
+                    waited = True
+        finally:
+            for conn in expired:
+                self._close(conn)
+
+        logger.warning(
+            'Timed out after %.1fs waiting for one of %d database '
+            'connections.', self.timeout, self.max_size,
+        )
+        raise PoolTimeout(
+            f'No database connection available within {self.timeout}s.'
+        )
+
+    def _open(self, connect):
+        try:
+            conn = connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opened_at[conn] = time.monotonic()
+            self._stats['opened'] += 1
+        return conn
+
+    def _healthy(self, conn, returned_at):
+        if time.monotonic() - returned_at < self.health_check_idle:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            self.discard(conn)
+            return False
+
+    def _expired(self, conn):
+        opened_at = self._opened_at.get(conn)
+        return (
+            opened_at is None
+            or time.monotonic() - opened_at >= self.max_lifetime
+        )
+
+    def _stale(self):
+        """Remove idle connections unused for ``max_idle`` seconds."""
+        now = time.monotonic()
+        stale = []
+        while (
+            self._idle and self._size > self.min_size
+            and now - self._idle[0][1] >= self.max_idle
+        ):
+            conn, _ = self._idle.pop(0)
+            self._forget(conn)
+            stale.append(conn)
+        return stale
+
+    def _forget(self, conn):
+        """Drop an open connection from the books. Hold the lock."""
+        self._opened_at.pop(conn, None)
+        self._size -= 1
+        self._stats['closed'] += 1
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+def get_pool(key, factory):
+    """Return the process's pool for ``key``, creating it with ``factory``.
+
+    Pools inherited through a fork stay referenced but unused, since
+    closing their connections would end the parent's sessions.
+    """
+    key = (os.getpid(), key)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = factory()
+    return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process."""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == pid]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,111 @@
+"""
+Background jobs stored in Postgres.
+
+A job names a module level function by its dotted path, plus the keyword
+arguments to call it with. ``enqueue`` inserts the job in the caller's
+transaction, so a job is only ever seen by workers once the data it refers
+to has been committed, and is dropped with it on rollback.
+
+Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` and hold them
+for a visibility timeout. A job whose worker dies is claimed again once the
+timeout passes, so functions run at least once and should be idempotent.
+Failed jobs are retried with exponential backoff until ``max_attempts``.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_VISIBILITY_TIMEOUT = 300
+RETRY_BASE_DELAY = 10
+RETRY_MAX_DELAY = 3600
+
+
+def enqueue(func, *, run_at=None, max_attempts=DEFAULT_MAX_ATTEMPTS, **kwargs):
+    """Queue ``func(**kwargs)``, ``kwargs`` must be JSON serializable."""
+    return Job.objects.create(
+        name=f'{func.__module__}.{func.__qualname__}',
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def claim(limit=1, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Lock up to ``limit`` due jobs for this worker and return them."""
+    now = timezone.now()
+    expired = Q(status=Job.RUNNING, locked_until__lt=now)
+    # A job whose worker keeps dying on it must not be retried forever.
+    Job.objects.filter(expired, attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_until=None,
+        last_error='Visibility timeout expired.',
+    )
+    locked_until = now + timedelta(seconds=visibility_timeout)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED, run_at__lte=now) | expired)
+            .order_by('run_at', 'id')[:limit]
+        )
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=locked_until,
+        )
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_until = locked_until
+    return jobs
+
+
+def retry_delay(attempts):
+    """Seconds before retrying a job that failed ``attempts`` times."""
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run(job):
+    """Run a claimed job, return True if it succeeded.
+
+    Succeeded jobs are deleted. Outcomes are only recorded while this
+    worker still holds the job, not after it was claimed again.
+    """
+    held = Job.objects.filter(pk=job.pk, attempts=job.attempts)
+    try:
+        import_string(job.name)(**job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.name)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            held.update(status=Job.FAILED, last_error=error, locked_until=None)
+        else:
+            held.update(
+                status=Job.QUEUED,
+                last_error=error,
+                locked_until=None,
+                run_at=timezone.now() + timedelta(
+                    seconds=retry_delay(job.attempts)
+                ),
+            )
+        return False
+    held.delete()
+    return True
+
+
+def work(limit=1, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Claim and run up to ``limit`` jobs, return how many were claimed."""
+    jobs = claim(limit, visibility_timeout)
+    for job in jobs:
+        run(job)
+    return len(jobs)
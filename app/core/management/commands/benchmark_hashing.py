@@ -0,0 +1,67 @@
+"""
+Django command to measure password hashing throughput.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+from user import hashing
+
+
+class Command(BaseCommand):
+    """Django command to benchmark login password checks."""
+    help = (
+        'Measure how many login password checks per second run inline and '
+        'in the hashing pool, using the preferred password hasher.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins', type=int, default=100,
+            help='Password checks to run in the pool.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.PASSWORD_HASH_WORKERS,
+            help='Processes in the pool.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        logins, workers = options['logins'], options['workers']
+        hasher = get_hasher('default')
+        path = hashing._hasher_path(hasher)
+        encoded = hasher.encode('benchmark', hasher.salt())
+
+        inline = max(1, logins // workers)
+        started = time.perf_counter()
+        for _ in range(inline):
+            hashing._verify(path, 'benchmark', encoded, False)
+        inline_rate = inline / (time.perf_counter() - started)
+        self.stdout.write(
+            f'{hasher.algorithm} inline: {inline_rate:.1f} logins/s'
+        )
+
+        pool = hashing.HashingPool(workers=workers, queue_size=logins)
+        try:
+            # Start the processes before timing.
+            pool.run(hashing._verify, path, 'benchmark', encoded, False)
+            with ThreadPoolExecutor(max_workers=workers * 2) as threads:
+                started = time.perf_counter()
+                list(threads.map(
+                    lambda _: pool.run(
+                        hashing._verify, path, 'benchmark', encoded, False,
+                    ),
+                    range(logins),
+                ))
+                elapsed = time.perf_counter() - started
+        finally:
+            pool.shutdown()
+
+        rate = logins / elapsed
+        self.stdout.write(self.style.SUCCESS(
+            f'{hasher.algorithm} pool of {workers}: {rate:.1f} logins/s, '
+            f'{rate / workers:.1f} logins/s per core'
+        ))
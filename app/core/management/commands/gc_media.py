@@ -0,0 +1,222 @@
+"""
+Delete recipe image files that no recipe references anymore.
+"""
+import heapq
+import itertools
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import ImageBlob
+from recipe.renditions import RENDITIONS
+
+RENDITION_RE = re.compile(
+    r'^(?P<stem>.+)\.(?:%s)\.jpg$' % '|'.join(map(re.escape, RENDITIONS))
+)
+# Extensions an original next to a rendition may have.
+ORIGINAL_EXTENSIONS = ['.png', '.jpg', '.jpeg']
+
+
+def _key(relative):
+    # Compare paths component-wise, matching the walk order.
+    return relative.split(os.sep)
+
+
+class Command(BaseCommand):
+    """Django command to garbage collect orphaned recipe images.
+
+    The upload directory is streamed with ``os.scandir`` one directory at a
+    time, in name order, and files are checked against ``ImageBlob`` in
+    batches. ``--max-files`` bounds the work done per run: files are then
+    taken in name order, keeping only that many names in memory even for
+    a directory of millions. With ``--checkpoint`` a run records the last
+    file it checked and the next run resumes after it.
+    """
+    help = 'Delete recipe image files that no recipe references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=os.path.join('uploads', 'recipe'),
+            help='Directory to collect, relative to MEDIA_ROOT.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Files checked per database query.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Keep files modified less than this many seconds ago.',
+        )
+        parser.add_argument(
+            '--max-files', type=int, default=None,
+            help='Stop after scanning about this many files.',
+        )
+        parser.add_argument(
+            '--checkpoint', default=None,
+            help='File recording progress, to resume an interrupted pass.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report orphans without deleting them.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.root = os.path.join(settings.MEDIA_ROOT, options['path'])
+        self.batch_size = options['batch_size']
+        self.cutoff = time.time() - options['min_age']
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.scanned = self.orphans = self.orphan_bytes = 0
+        self.remaining = options['max_files']
+        self.checkpoint = options['checkpoint']
+        resume_directory, resume_name = self._read_checkpoint()
+
+        finished = True
+        directories = self._directories(
+            resume_directory, resume_name is not None,
+        )
+        for directory in directories:
+            if self.remaining == 0:
+                finished = False
+                break
+            after = resume_name if directory == resume_directory else None
+            if not self._collect(directory, after):
+                finished = False
+                break
+            self._write_checkpoint(directory)
+        if finished:
+            self._write_checkpoint(None)
+
+        verb = 'Found' if self.dry_run else 'Deleted'
+        self.stdout.write(
+            f'Scanned {self.scanned} files. {verb} {self.orphans} orphans '
+            f'({self.orphan_bytes} bytes).'
+        )
+        if not finished:
+            self.stdout.write('Stopped early, run again to continue.')
+
+    def _directories(self, resume_after, inclusive):
+        """Yield the root and its subdirectories, relative, in name order.
+
+        Directories up to ``resume_after`` are skipped, up to and including
+        it unless ``inclusive``.
+        """
+        if not os.path.isdir(self.root):
+            return
+        resume_key = None if resume_after is None else _key(resume_after)
+        pending = ['']
+        while pending:
+            relative = pending.pop()
+            if (
+                resume_key is None or _key(relative) > resume_key
+                or (inclusive and relative == resume_after)
+            ):
+                yield relative
+            with os.scandir(os.path.join(self.root, relative)) as entries:
+                subdirectories = sorted(
+                    os.path.join(relative, entry.name) for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                )
+            pending.extend(reversed(subdirectories))
+
+    def _collect(self, relative, after=None):
+        """Collect the files of one directory named after ``after``.
+
+        Returns False when ``--max-files`` stopped it before the end.
+        """
+        with os.scandir(os.path.join(self.root, relative)) as entries:
+            files = (
+                entry for entry in entries
+                if entry.is_file(follow_symlinks=False)
+                and (after is None or entry.name > after)
+            )
+            if self.remaining is None:
+                for batch in self._batches(files):
+                    self._collect_batch(batch)
+                return True
+            # One more than allowed, to tell whether the directory is done.
+            selected = heapq.nsmallest(
+                self.remaining + 1, files, key=lambda entry: entry.name,
+            )
+
+        done = len(selected) <= self.remaining
+        for batch in self._batches(selected[:self.remaining]):
+            self._collect_batch(batch)
+            self.remaining -= len(batch)
+            self._write_checkpoint(relative, batch[-1].name)
+        return done
+
+    def _batches(self, entries):
+        entries = iter(entries)
+        while True:
+            batch = list(itertools.islice(entries, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _collect_batch(self, entries):
+        """Delete the orphans among ``entries`` with one database query."""
+        self.scanned += len(entries)
+        candidates = []
+        for entry in entries:
+            name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+            name = name.replace('\\', '/')
+            match = RENDITION_RE.match(name)
+            if match:
+                # Renditions live as long as their original is referenced.
+                owners = [match['stem'] + ext for ext in ORIGINAL_EXTENSIONS]
+            else:
+                owners = [name]
+            candidates.append((entry, name, owners))
+        wanted = {owner for _, _, owners in candidates for owner in owners}
+        referenced = set(ImageBlob.objects.filter(
+            name__in=wanted, ref_count__gt=0,
+        ).values_list('name', flat=True))
+
+        orphans = []
+        for entry, name, owners in candidates:
+            if referenced.intersection(owners):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            # Recently written or reused files may be about to be referenced.
+            if stat.st_mtime > self.cutoff:
+                continue
+            orphans.append(name)
+            self.orphans += 1
+            self.orphan_bytes += stat.st_size
+            if self.verbosity > 1:
+                self.stdout.write(entry.path)
+            if not self.dry_run:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        if not self.dry_run:
+            ImageBlob.objects.filter(name__in=orphans, ref_count=0).delete()
+
+    def _read_checkpoint(self):
+        """Return the directory and, if unfinished, the file to resume at."""
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return None, None
+        with open(self.checkpoint) as checkpoint:
+            content = checkpoint.read()
+        if not content:
+            return None, None
+        # The root directory is recorded as an empty first line.
+        directory, _, name = content.partition('\n')
+        return directory, name.strip() or None
+
+    def _write_checkpoint(self, directory, name=None):
+        """Record a finished ``directory``, or its last file checked."""
+        if not self.checkpoint:
+            return
+        if directory is None:
+            if os.path.exists(self.checkpoint):
+                os.remove(self.checkpoint)
+            return
+        with open(self.checkpoint, 'w') as checkpoint:
+            checkpoint.write(f'{directory}\n{name or ""}')
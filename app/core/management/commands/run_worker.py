@@ -0,0 +1,115 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import (
+    InterfaceError,
+    OperationalError,
+    close_old_connections,
+    connection,
+)
+
+from core import jobs
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait after the database failed, doubling while it keeps failing.
+ERROR_BASE_DELAY = 1
+ERROR_MAX_DELAY = 60
+
+
+class Command(BaseCommand):
+    """Django command to run queued background jobs."""
+    help = 'Run background jobs from the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of worker threads.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1,
+            help='Jobs claimed at once by each thread.',
+        )
+        parser.add_argument(
+            '--visibility-timeout', type=int,
+            default=jobs.DEFAULT_VISIBILITY_TIMEOUT,
+            help='Seconds before a claimed, unfinished job is run again.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when the queue is empty.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.options = options
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.processed = 0
+
+        previous = {
+            signum: signal.signal(signum, self._stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            if options['concurrency'] <= 1:
+                self._work()
+            else:
+                threads = [
+                    threading.Thread(target=self._work_in_thread, daemon=True)
+                    for _ in range(options['concurrency'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f'Processed {self.processed} jobs.')
+
+    def _stop(self, signum, frame):
+        # Let running jobs finish, but claim no new ones.
+        self.stopping.set()
+
+    def _work(self):
+        failures = 0
+        while not self.stopping.is_set():
+            # Replaces connections broken by a database restart, unless
+            # the command was called inside a transaction.
+            if not connection.in_atomic_block:
+                close_old_connections()
+            try:
+                claimed = jobs.work(
+                    self.options['batch_size'],
+                    self.options['visibility_timeout'],
+                )
+            except (OperationalError, InterfaceError):
+                failures += 1
+                delay = min(
+                    ERROR_BASE_DELAY * 2 ** (failures - 1), ERROR_MAX_DELAY
+                )
+                logger.exception(
+                    'Database error while working, retrying in %ss.', delay
+                )
+                self.stopping.wait(delay)
+                continue
+            failures = 0
+            with self.lock:
+                self.processed += claimed
+            if not claimed:
+                if self.options['burst']:
+                    return
+                self.stopping.wait(self.options['poll_interval'])
+
+    def _work_in_thread(self):
+        try:
+            self._work()
+        finally:
+            connection.close()
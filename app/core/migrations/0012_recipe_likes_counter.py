@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    Like = apps.get_model('core', 'Like')
+    likes = Like.objects.filter(recipe=OuterRef('pk')).order_by().values(
+        'recipe'
+    ).annotate(total=Count('id')).values('total')
+    Recipe.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='recipe',
+            name='likes_count',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    Like = apps.get_model('core', 'Like')
+    duplicates = Like.objects.order_by().values('user', 'recipe').annotate(
+        first=Min('id'), total=Count('id'),
+    ).filter(total__gt=1)
+    recipe_ids = set()
+    for duplicate in duplicates.iterator():
+        Like.objects.filter(
+            user=duplicate['user'], recipe=duplicate['recipe'],
+        ).exclude(id=duplicate['first']).delete()
+        recipe_ids.add(duplicate['recipe'])
+    likes = Like.objects.filter(recipe=OuterRef('pk')).order_by().values(
+        'recipe'
+    ).annotate(total=Count('id')).values('total')
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        likes_count=Coalesce(Subquery(likes), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_likes_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='core_like_unique_user_recipe'),
+        ),
+    ]
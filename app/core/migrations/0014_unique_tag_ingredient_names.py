@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def _merge_duplicates(apps, model_name, relation):
+    Model = apps.get_model('core', model_name)
+    Recipe = apps.get_model('core', 'Recipe')
+    Through = Recipe._meta.get_field(relation).remote_field.through
+    column = f'{model_name.lower()}_id'
+    duplicates = Model.objects.order_by().values('user', 'name').annotate(
+        keep=Min('id'), total=Count('id'),
+    ).filter(total__gt=1)
+    for duplicate in duplicates.iterator():
+        extra_ids = list(Model.objects.filter(
+            user=duplicate['user'], name=duplicate['name'],
+        ).exclude(id=duplicate['keep']).values_list('id', flat=True))
+        linked = set(Through.objects.filter(
+            **{f'{column}__in': extra_ids}
+        ).values_list('recipe_id', flat=True))
+        already_linked = set(Through.objects.filter(
+            **{column: duplicate['keep']}
+        ).values_list('recipe_id', flat=True))
+        Through.objects.bulk_create([
+            Through(recipe_id=recipe_id, **{column: duplicate['keep']})
+            for recipe_id in linked - already_linked
+        ])
+        Model.objects.filter(id__in=extra_ids).delete()
+
+
+def merge_duplicate_names(apps, schema_editor):
+    _merge_duplicates(apps, 'Tag', 'tags')
+    _merge_duplicates(apps, 'Ingredient', 'ingredients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_like_unique_user_recipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_unique_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_unique_user_name'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+CHANGE_TABLES = ['core_recipe', 'core_tag', 'core_ingredient', 'core_tombstone']
+
+CHANGE_SEQ_SQL = """
+CREATE SEQUENCE core_change_seq;
+
+CREATE FUNCTION core_change_seq_update() RETURNS trigger AS $$
+BEGIN
+    NEW.change_txid := txid_current();
+    NEW.change_seq := nextval('core_change_seq');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+""" + "".join(f"""
+CREATE TRIGGER core_change_seq
+    BEFORE INSERT OR UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION core_change_seq_update();
+
+UPDATE {table} SET change_seq = NULL;
+""" for table in CHANGE_TABLES)
+
+DROP_CHANGE_SEQ_SQL = "".join(
+    f"DROP TRIGGER IF EXISTS core_change_seq ON {table};\n"
+    for table in CHANGE_TABLES
+) + """
+DROP FUNCTION IF EXISTS core_change_seq_update();
+DROP SEQUENCE IF EXISTS core_change_seq;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('change_txid', models.BigIntegerField(editable=False, null=True)),
+                ('change_seq', models.BigIntegerField(editable=False, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='change_txid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='change_txid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='change_txid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['change_txid', 'change_seq'], name='core_ingredient_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['change_txid', 'change_seq'], name='core_recipe_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['change_txid', 'change_seq'], name='core_tag_change_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['change_txid', 'change_seq'], name='core_tombstone_change_idx'),
+        ),
+        migrations.RunSQL(CHANGE_SEQ_SQL, DROP_CHANGE_SEQ_SQL),
+    ]
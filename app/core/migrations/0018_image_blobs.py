@@ -0,0 +1,69 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:41
+
+import core.models
+import core.storage
+import django.core.validators
+from django.db import migrations, models
+import django.utils.timezone
+
+
+IMAGE_REFCOUNT_SQL = """
+CREATE FUNCTION core_recipe_image_refcount() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND OLD.image <> ''
+            AND (TG_OP = 'DELETE' OR NEW.image IS DISTINCT FROM OLD.image) THEN
+        UPDATE core_imageblob
+        SET ref_count = ref_count - 1, updated_at = now()
+        WHERE name = OLD.image;
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.image <> ''
+            AND (TG_OP = 'INSERT' OR NEW.image IS DISTINCT FROM OLD.image) THEN
+        INSERT INTO core_imageblob (name, ref_count, created_at, updated_at)
+        VALUES (NEW.image, 1, now(), now())
+        ON CONFLICT (name) DO UPDATE
+        SET ref_count = core_imageblob.ref_count + 1, updated_at = now();
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_image_refcount
+    AFTER INSERT OR UPDATE OF image OR DELETE ON core_recipe
+    FOR EACH ROW EXECUTE FUNCTION core_recipe_image_refcount();
+
+INSERT INTO core_imageblob (name, ref_count, created_at, updated_at)
+SELECT image, count(*), now(), now()
+FROM core_recipe WHERE image <> ''
+GROUP BY image;
+"""
+
+DROP_IMAGE_REFCOUNT_SQL = """
+DROP TRIGGER IF EXISTS core_recipe_image_refcount ON core_recipe;
+DROP FUNCTION IF EXISTS core_recipe_image_refcount();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path, validators=[django.core.validators.FileExtensionValidator(['png'])]),
+        ),
+        migrations.RunSQL(IMAGE_REFCOUNT_SQL, DROP_IMAGE_REFCOUNT_SQL),
+    ]
@@ -2,14 +2,24 @@ import uuid
 from django.core.validators import FileExtensionValidator
 import os
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
 from django.utils import timezone
+
+from core.storage import ContentAddressedStorage
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+# Text search configuration of search queries. It has to match the one the
+# search_vector trigger was created with, so changing it takes a migration
+# that recreates the trigger.
+RECIPE_SEARCH_CONFIG = 'english'
+
+
 def recipe_image_file_path(instance, filename):
     ext = os.path.splitext(filename)[1]
     filename = f'{uuid.uuid4()}{ext}'
@@ -21,18 +31,48 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Set by the core_change_seq trigger on insert/update.
+    change_txid = models.BigIntegerField(null=True, editable=False)
+    change_seq = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=['name'],
+                name='core_tag_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            models.Index(
+                fields=['change_txid', 'change_seq'],
+                name='core_tag_change_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_unique_user_name',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 class UserManager(BaseUserManager):
 
-    def create_user(self, email, password=None, **extra_fields):
-        """Create, save and return a new user."""
+    def create_user(self, email, password=None, *, encoded_password=None,
+                    **extra_fields):
+        """Create, save and return a new user.
+
+        A password hashed beforehand is passed as ``encoded_password``.
+        """
         if not email:
             raise ValueError('User must have an email address.')
         user = self.model(email=self.normalize_email(email), **extra_fields)
-        user.set_password(password)
+        if encoded_password is not None:
+            user.password = encoded_password
+        else:
+            user.set_password(password)
         user.save(using=self._db)
 
         return user
@@ -67,29 +107,75 @@ class Recipe(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     tags = models.ManyToManyField(Tag)
-    likes_count = models.ManyToManyField('Like', related_name='likes_count')
+    likes_count = models.PositiveIntegerField(default=0)
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(upload_to=recipe_image_file_path,
+                              storage=ContentAddressedStorage(),
                               validators=[FileExtensionValidator(['png'])])
+    # Storage names of the downscaled renditions by name, see
+    # recipe.renditions.
+    image_renditions = models.JSONField(
+        default=dict, blank=True, editable=False,
+    )
+    # Read from the upload's header, and a placeholder rendered by clients
+    # while the image loads, computed with the renditions.
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_blurhash = models.CharField(
+        max_length=64, blank=True, editable=False,
+    )
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
+    # Maintained by the core_recipe_search_vector trigger on insert/update.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set by the core_change_seq trigger on insert/update.
+    change_txid = models.BigIntegerField(null=True, editable=False)
+    change_seq = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='core_recipe_created_id_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+            GinIndex(
+                fields=['title'],
+                name='core_recipe_title_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            models.Index(
+                fields=['change_txid', 'change_seq'],
+                name='core_recipe_change_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
     def like_recipe(self, user):
-        like, created = Like.objects.get_or_create(recipe=self, user=user)
-        if created:
-            self.likes_count.add(like)
+        """Like the recipe, return True if it was not liked before."""
+        return Like.objects.like(user, self.pk) is not None
 
     def unlike_recipe(self, user):
-        try:
-            like = self.likes_count.get(user=user)
-            self.likes_count.remove(like)
-            like.delete()
-        except Like.DoesNotExist:
-            pass
+        """Remove the user's like, return True if there was one."""
+        return Like.objects.unlike(user, self.pk) is not None
 
     def get_total_likes(self):
-        return self.likes_count.count()
+        return self.likes_count
+
+
+class ImageBlob(models.Model):
+    """A stored recipe image, shared by all recipes with the same content."""
+    name = models.CharField(max_length=255, unique=True)
+    # Maintained by the core_recipe_image_refcount trigger.
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=255)
@@ -97,13 +183,205 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Set by the core_change_seq trigger on insert/update.
+    change_txid = models.BigIntegerField(null=True, editable=False)
+    change_seq = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=['name'],
+                name='core_ingredient_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            models.Index(
+                fields=['change_txid', 'change_seq'],
+                name='core_ingredient_change_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_unique_user_name',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+
+class LikeManager(models.Manager):
+    """Like and unlike recipes in a single statement each.
+
+    The like row and the recipe's ``likes_count`` are written by one
+    data-modifying CTE, relying on the unique ``(user, recipe)`` constraint
+    to make repeated likes no-ops. Both methods return the recipe's new
+    like count, or None when nothing changed.
+    """
+
+    def like(self, user, recipe_id):
+        sql = f"""
+            WITH liked AS (
+                INSERT INTO {self.model._meta.db_table} (user_id, recipe_id)
+                SELECT %s, id FROM {Recipe._meta.db_table} WHERE id = %s
+                ON CONFLICT (user_id, recipe_id) DO NOTHING
+                RETURNING recipe_id
+            )
+            UPDATE {Recipe._meta.db_table}
+            SET likes_count = likes_count + 1, updated_at = now()
+            WHERE id IN (SELECT recipe_id FROM liked)
+            RETURNING likes_count
+        """
+        return self._execute(sql, [user.pk, recipe_id])
+
+    def unlike(self, user, recipe_id):
+        sql = f"""
+            WITH unliked AS (
+                DELETE FROM {self.model._meta.db_table}
+                WHERE user_id = %s AND recipe_id = %s
+                RETURNING recipe_id
+            )
+            UPDATE {Recipe._meta.db_table}
+            SET likes_count = likes_count - 1, updated_at = now()
+            WHERE id IN (SELECT recipe_id FROM unliked)
+            RETURNING likes_count
+        """
+        return self._execute(sql, [user.pk, recipe_id])
+
+    def _execute(self, sql, params):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
 class Like(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
-    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
\ No newline at end of file
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    objects = LikeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='core_like_unique_user_recipe',
+            ),
+        ]
+
+
+class TombstoneManager(models.Manager):
+
+    def record(self, objs):
+        """Record the deletion of recipes, tags or ingredients."""
+        return self.bulk_create([
+            self.model(
+                kind=obj._meta.model_name,
+                object_id=obj.pk,
+                user_id=obj.user_id,
+            )
+            for obj in objs
+        ])
+
+
+class Tombstone(models.Model):
+    """A deleted recipe, tag or ingredient, kept for incremental sync."""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = [
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    deleted_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set by the core_change_seq trigger on insert/update.
+    change_txid = models.BigIntegerField(null=True, editable=False)
+    change_seq = models.BigIntegerField(null=True, editable=False)
+    objects = TombstoneManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['change_txid', 'change_seq'],
+                name='core_tombstone_change_idx',
+            ),
+        ]
+
+
+class Job(models.Model):
+    """A queued call of a function, run by the run_worker command."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='core_job_status_run_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class RevokedTokenManager(models.Manager):
+
+    def revoke(self, jti, expires_at):
+        """Revoke a token, returning False if it was already revoked."""
+        sql = f"""
+            INSERT INTO {self.model._meta.db_table}
+                (jti, expires_at, revoked_at)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (jti) DO NOTHING
+            RETURNING id
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [jti, expires_at, timezone.now()])
+            return cursor.fetchone() is not None
+
+    def prune(self):
+        """Delete revocations of tokens that have expired anyway."""
+        return self.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+class RevokedToken(models.Model):
+    """The JTI of a token that was logged out or rotated."""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(
+        default=timezone.now, db_index=True, editable=False,
+    )
+    objects = RevokedTokenManager()
+
+    def __str__(self):
+        return self.jti
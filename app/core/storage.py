@@ -0,0 +1,71 @@
+"""
+Content-addressed file storage.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(file):
+    """SHA-256 of ``file``, reusing one computed while it was uploaded."""
+    digest = getattr(file, 'sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        digest = file.sha256 = hasher.hexdigest()
+    return digest
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Store each distinct file once, named by the SHA-256 of its content.
+
+    Files land in ``<upload dir>/<first 2 hex digits>/<hash><ext>``, so a
+    name always refers to the same bytes and can be cached forever. Saving
+    content that is already stored only refreshes the file's mtime, which
+    keeps the garbage collector from racing the new reference.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(
+            self.hashed_name(name, content_hash(content)), content, max_length
+        )
+
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], f'{digest}{ext}')
+
+    def get_available_name(self, name, max_length=None):
+        # The name is derived from the content, an existing file with the
+        # same name is the same file.
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        # Write under a temporary name and link it into place, so the file
+        # appears complete or not at all and concurrent saves of the same
+        # content are harmless.
+        directory, basename = os.path.split(name)
+        temp_name = os.path.join(
+            directory, f'.{basename}.{uuid.uuid4().hex}.tmp'
+        )
+        temp_name = super()._save(temp_name, content)
+        try:
+            os.link(self.path(temp_name), self.path(name))
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(self.path(temp_name))
+        return name.replace('\\', '/')
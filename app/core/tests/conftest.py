@@ -1,11 +1,27 @@
+import contextlib
+
 import pytest
 
 from rest_framework.test import APIClient
 
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from core import models
 from core.tests import test_factory
+from user.authentication import user_cache
+from user.revocation import revocation_list
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    for cache in caches.all():
+        cache.clear()
+    user_cache.clear()
+    revocation_list.clear()
 
 @pytest.fixture
 def user() -> models.User:
@@ -40,4 +56,19 @@ def admin_auth_client(api_client, admin_user):
 @pytest.fixture
 def recipe() -> models.Recipe:
     recipe = test_factory.RecipeFactory()
-    return recipe
\ No newline at end of file
+    return recipe
+
+
+@pytest.fixture
+def assert_query_budget():
+    """Fail when the wrapped block runs more queries than its budget."""
+    @contextlib.contextmanager
+    def _assert_query_budget(budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        queries = '\n'.join(q['sql'] for q in context.captured_queries)
+        assert executed <= budget, (
+            f'{executed} queries executed, budget is {budget}:\n{queries}'
+        )
+    return _assert_query_budget
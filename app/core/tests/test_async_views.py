@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import async_to_sync
+from django.test import Client
+from django.urls import resolve, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.tests import test_factory
+from core import models
+from recipe import async_views, views
+from user.revocation import revoke
+
+import pytest
+
+# Requests served through ASGI read on threads with their own connections,
+# which only see committed data.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@pytest.fixture
+def authorization(user):
+    return f'Bearer {RefreshToken.for_user(user).access_token}'
+
+
+async def asgi_call(method, path, body=b'', **headers):
+    """Run a request through the ASGI handler as a server would.
+
+    Returns the response status and the body messages sent.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-length', str(len(body)).encode()),
+        ] + [
+            (name.encode(), value.encode()) for name, value in headers.items()
+        ],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await async_views.ASGIHandler()(scope, receive, send)
+    return messages[0]['status'], [
+        message.get('body', b'') for message in messages
+        if message['type'] == 'http.response.body'
+    ]
+
+
+def asgi_request(method, path, body=b'', **headers):
+    status, parts = async_to_sync(asgi_call)(method, path, body, **headers)
+    return status, b''.join(parts)
+
+
+def get_all(*paths, **headers):
+    """GET ``paths`` concurrently, returning each status and body."""
+    async def fetch():
+        return await asyncio.gather(*[
+            asgi_call('GET', path, **headers) for path in paths
+        ])
+    return [
+        (status, b''.join(parts)) for status, parts in async_to_sync(fetch)()
+    ]
+
+
+class TestAsyncReads:
+
+    def test_reads_match_wsgi_responses(self, user, authorization):
+        recipe = test_factory.RecipeFactory(user=user)
+        test_factory.TagsFactory(user=user)
+        test_factory.IngredientsFactory(user=user)
+        paths = [RECIPES_URL, detail_url(recipe.id), TAGS_URL, INGREDIENTS_URL]
+
+        responses = get_all(*paths, authorization=authorization)
+
+        client = Client(HTTP_AUTHORIZATION=authorization)
+        for path, (status, content) in zip(paths, responses):
+            assert status == 200
+            assert json.loads(content) == client.get(path).json()
+
+    def test_reads_are_served_concurrently(
+        self, user, authorization, monkeypatch,
+    ):
+        test_factory.RecipeFactory(user=user)
+        requests = 3
+        # Only passable when all requests are inside the view at once.
+        barrier = threading.Barrier(requests, timeout=10)
+        list_recipes = views.RecipeViewSet.list
+
+        def blocking_list(self, request, *args, **kwargs):
+            barrier.wait()
+            return list_recipes(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(views.RecipeViewSet, 'list', blocking_list)
+
+        responses = get_all(
+            *[RECIPES_URL] * requests, authorization=authorization,
+        )
+
+        assert [status for status, _ in responses] == [200] * requests
+
+    def test_wsgi_views_stay_synchronous(self):
+        view = resolve(RECIPES_URL).func
+
+        assert not asyncio.iscoroutinefunction(view)
+        assert asyncio.iscoroutinefunction(view.async_view)
+
+    def test_export_streams_under_asgi(self, user, authorization):
+        recipes = test_factory.RecipeFactory.create_batch(3, user=user)
+
+        status, content = asgi_request(
+            'GET', EXPORT_URL, authorization=authorization,
+        )
+
+        assert status == 200
+        rows = [json.loads(line) for line in content.splitlines()]
+        assert [row['id'] for row in rows] == [r.id for r in recipes]
+
+    def test_export_is_sent_as_produced(
+        self, user, authorization, monkeypatch,
+    ):
+        test_factory.RecipeFactory.create_batch(3, user=user)
+        monkeypatch.setattr(async_views, 'STREAM_CHUNK_SIZE', 1)
+
+        status, parts = async_to_sync(asgi_call)(
+            'GET', EXPORT_URL, authorization=authorization,
+        )
+
+        assert status == 200
+        assert len([part for part in parts if part]) == 3
+
+    def test_import_streams_under_asgi(self, user, authorization):
+        body = json.dumps({'title': 'Soup', 'time_minutes': 5, 'price': '1'})
+
+        status, content = asgi_request(
+            'POST', IMPORT_URL, body.encode(),
+            authorization=authorization,
+            **{'content-type': 'application/x-ndjson'},
+        )
+
+        assert status == 200
+        result, = [json.loads(line) for line in content.splitlines()]
+        assert models.Recipe.objects.get(id=result['id']).user == user
+
+    def test_revoked_token_is_rejected(self, user):
+        token = RefreshToken.for_user(user).access_token
+        revoke(token)
+
+        (status, _), = get_all(TAGS_URL, authorization=f'Bearer {token}')
+
+        assert status == 401
+
+    def test_writes_still_work(self, user, authorization):
+        tag = test_factory.TagsFactory(user=user)
+
+        status, _ = asgi_request(
+            'PATCH', reverse('recipe:tag-detail', args=[tag.id]),
+            json.dumps({'name': 'Dessert'}).encode(),
+            authorization=authorization,
+            **{'content-type': 'application/json'},
+        )
+
+        assert status == 200
+        tag.refresh_from_db()
+        assert tag.name == 'Dessert'
@@ -0,0 +1,144 @@
+import psycopg2
+
+from django.db import connection
+from django.urls import reverse
+
+from core.tests import test_factory
+from core import models
+
+import pytest
+
+# Change cursors follow transaction ids, so every write must commit.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+CHANGES_URL = reverse('recipe:changes-list')
+CHANGES_QUERY_BUDGET = 7
+
+
+def detail_url(model_name, item_id):
+    return reverse(f"recipe:{model_name}-detail", args=[item_id])
+
+
+def sync(client, since=None, **params):
+    if since is not None:
+        params['since'] = since
+    res = client.get(CHANGES_URL, params)
+    assert res.status_code == 200
+    return res.data
+
+
+def ids(items):
+    return sorted(item['id'] for item in items)
+
+
+class TestChangesWOAuth:
+
+    def test_auth_required(self, api_client):
+        res = api_client.get(CHANGES_URL)
+        assert res.status_code == 401
+
+
+class TestChanges:
+
+    def test_full_then_incremental_sync(self, auth_client, user):
+        tag = test_factory.TagsFactory.create(user=user)
+        ingredient = test_factory.IngredientsFactory.create(user=user)
+        recipes = test_factory.RecipeFactory.create_batch(2, user=user)
+        first = sync(auth_client)
+        assert ids(first['recipes']) == sorted(recipe.id for recipe in recipes)
+        assert ids(first['tags']) == [tag.id]
+        assert ids(first['ingredients']) == [ingredient.id]
+        assert first['has_more'] is False
+
+        unchanged = sync(auth_client, first['cursor'])
+        assert unchanged['recipes'] == unchanged['tags'] == []
+
+        auth_client.patch(
+            detail_url('recipe', recipes[0].id), {'title': 'New'}
+        )
+        delta = sync(auth_client, unchanged['cursor'])
+        assert [item['title'] for item in delta['recipes']] == ['New']
+        assert delta['tags'] == delta['ingredients'] == delta['deleted'] == []
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test_query_budget(self, auth_client, user, assert_query_budget, count):
+        tags = test_factory.TagsFactory.create_batch(count, user=user)
+        test_factory.IngredientsFactory.create_batch(count, user=user)
+        test_factory.RecipeFactory.create_batch(
+            count, user=user, ingredients_and_tags_and_likes=tags
+        )
+        models.Tombstone.objects.record(tags[:1])
+        with assert_query_budget(CHANGES_QUERY_BUDGET):
+            data = sync(auth_client)
+        assert len(data['recipes']) == count
+        assert len(data['deleted']) == 1
+
+    def test_deletes_become_tombstones(self, auth_client, user):
+        tag = test_factory.TagsFactory.create(user=user)
+        recipe = test_factory.RecipeFactory.create(
+            user=user, ingredients_and_tags_and_likes=[tag]
+        )
+        doomed = test_factory.RecipeFactory.create(user=user)
+        cursor = sync(auth_client)['cursor']
+
+        auth_client.delete(detail_url('tag', tag.id))
+        auth_client.delete(detail_url('recipe', doomed.id))
+        delta = sync(auth_client, cursor)
+        assert delta['deleted'] == [
+            {'type': 'tag', 'id': tag.id},
+            {'type': 'recipe', 'id': doomed.id},
+        ]
+        assert [item['id'] for item in delta['recipes']] == [recipe.id]
+        assert delta['recipes'][0]['tags'] == []
+
+    def test_other_users_items_hidden(self, auth_client, user):
+        other_tag = test_factory.TagsFactory.create()
+        other_recipe = test_factory.RecipeFactory.create()
+        test_factory.TagsFactory.create(user=user)
+        first = sync(auth_client)
+        assert other_tag.id not in ids(first['tags'])
+        assert ids(first['recipes']) == [other_recipe.id]
+
+        other_recipe_id = other_recipe.id
+        models.Tombstone.objects.record([other_tag, other_recipe])
+        other_tag.delete()
+        other_recipe.delete()
+        delta = sync(auth_client, first['cursor'])
+        assert delta['deleted'] == [{'type': 'recipe', 'id': other_recipe_id}]
+
+    def test_paging_visits_every_change_once(self, auth_client, user):
+        test_factory.TagsFactory.create_batch(3, user=user)
+        test_factory.IngredientsFactory.create_batch(2, user=user)
+        test_factory.RecipeFactory.create_batch(2, user=user)
+        seen, cursor, has_more = [], None, True
+        while has_more:
+            page = sync(auth_client, cursor, limit=2)
+            items = page['recipes'] + page['tags'] + page['ingredients']
+            assert len(items) <= 2
+            seen += items
+            cursor, has_more = page['cursor'], page['has_more']
+        assert len(seen) == 7
+        assert sync(auth_client, cursor)['tags'] == []
+
+    def test_late_commit_not_skipped(self, auth_client, user):
+        """A write committed after the client read past its sequence."""
+        other = psycopg2.connect(**connection.get_connection_params())
+        try:
+            with other.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO core_tag (name, user_id, updated_at) '
+                    'VALUES (%s, %s, now()) RETURNING id',
+                    ['late', user.id],
+                )
+                late_id = cursor.fetchone()[0]
+            early = test_factory.TagsFactory.create(user=user)
+            first = sync(auth_client)
+            assert ids(first['tags']) == [early.id]
+            other.commit()
+        finally:
+            other.close()
+        assert late_id in ids(sync(auth_client, first['cursor'])['tags'])
+
+    def test_invalid_cursor(self, auth_client):
+        res = auth_client.get(CHANGES_URL, {'since': 'garbage'})
+        assert res.status_code == 400
@@ -1,3 +1,6 @@
+import io
+import os
+import time
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error
 
@@ -5,6 +8,11 @@ from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
+from core import models
+from core.tests import test_factory
+
+import pytest
+
 @patch("core.management.commands.wait_for_db.Command.check")
 class TestCommands:
 
@@ -22,4 +30,131 @@ class TestCommands:
 
         call_command("wait_for_db")
         assert patched_check.call_count == 6
-        patched_check.asser_called_with(databases=["default"])
\ No newline at end of file
+        patched_check.asser_called_with(databases=["default"])
+
+
+@pytest.mark.django_db
+class TestGcMedia:
+
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        return tmp_path
+
+    def write(self, media_root, name, age=7200):
+        path = media_root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * 10)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def gc(self, *args):
+        out = io.StringIO()
+        call_command('gc_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_orphans_deleted(self, media_root):
+        recipe = test_factory.RecipeFactory.create()
+        kept = media_root / recipe.image.name
+        stem = os.path.splitext(recipe.image.name)[0]
+        kept_rendition = self.write(media_root, f'{stem}.card.jpg')
+        orphan = self.write(media_root, 'uploads/recipe/ab/abcd.png')
+        orphan_rendition = self.write(
+            media_root, 'uploads/recipe/ab/abcd.thumbnail.jpg',
+        )
+        legacy = self.write(media_root, 'uploads/recipe/1234-uuid.png')
+        young = self.write(media_root, 'uploads/recipe/cd/cdef.png', age=10)
+        models.ImageBlob.objects.create(name='uploads/recipe/ab/abcd.png')
+
+        out = self.gc()
+
+        assert kept.exists() and kept_rendition.exists() and young.exists()
+        assert not orphan.exists()
+        assert not orphan_rendition.exists()
+        assert not legacy.exists()
+        assert not models.ImageBlob.objects.filter(ref_count=0).exists()
+        assert 'Deleted 3 orphans (30 bytes)' in out
+
+    def test_dry_run_keeps_files(self, media_root):
+        orphan = self.write(media_root, 'uploads/recipe/ab/abcd.png')
+        out = self.gc('--dry-run')
+        assert orphan.exists()
+        assert 'Found 1 orphans' in out
+
+    def test_resumes_from_checkpoint(self, media_root, tmp_path_factory):
+        checkpoint = tmp_path_factory.mktemp('gc') / 'checkpoint'
+        orphans = [
+            self.write(media_root, f'uploads/recipe/{shard}/{shard}00.png')
+            for shard in ['aa', 'bb', 'cc']
+        ]
+        out = self.gc('--checkpoint', str(checkpoint), '--max-files', '1')
+        assert 'Stopped early' in out
+        assert checkpoint.read_text() == 'aa\n'
+        assert [path.exists() for path in orphans] == [False, True, True]
+
+        runs = 0
+        while checkpoint.exists():
+            self.gc('--checkpoint', str(checkpoint), '--max-files', '1')
+            runs += 1
+        assert runs == 2
+        assert not any(path.exists() for path in orphans)
+
+    def test_max_files_bounds_a_flat_directory(
+        self, media_root, tmp_path_factory,
+    ):
+        checkpoint = tmp_path_factory.mktemp('gc') / 'checkpoint'
+        orphans = [
+            self.write(media_root, f'uploads/recipe/{i}-uuid.png')
+            for i in range(5)
+        ]
+
+        out = self.gc(
+            '--checkpoint', str(checkpoint), '--max-files', '2',
+            '--batch-size', '1',
+        )
+
+        assert 'Scanned 2 files' in out
+        assert checkpoint.read_text() == '\n1-uuid.png'
+        assert [path.exists() for path in orphans] == [False] * 2 + [True] * 3
+
+        self.gc('--checkpoint', str(checkpoint), '--max-files', '2')
+        assert checkpoint.read_text() == '\n3-uuid.png'
+        out = self.gc('--checkpoint', str(checkpoint), '--max-files', '2')
+        assert 'Scanned 1 files' in out
+        assert not checkpoint.exists()
+        assert not any(path.exists() for path in orphans)
+
+    def test_resumes_inside_a_directory_without_max_files(
+        self, media_root, tmp_path_factory,
+    ):
+        checkpoint = tmp_path_factory.mktemp('gc') / 'checkpoint'
+        checkpoint.write_text('\n1-uuid.png')
+        orphans = [
+            self.write(media_root, f'uploads/recipe/{i}-uuid.png')
+            for i in range(3)
+        ]
+
+        out = self.gc('--checkpoint', str(checkpoint))
+
+        assert 'Scanned 1 files' in out
+        assert [path.exists() for path in orphans] == [True, True, False]
+        assert not checkpoint.exists()
+
+
+class TestBenchmarkHashing:
+
+    def test_reports_logins_per_core(self, settings):
+        settings.PASSWORD_HASHERS = [
+            'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]
+        out = io.StringIO()
+
+        call_command(
+            'benchmark_hashing', '--logins', '4', '--workers', '1', stdout=out,
+        )
+
+        output = out.getvalue()
+        assert 'md5 inline:' in output
+        assert 'md5 pool of 1:' in output
+        assert 'logins/s per core' in output
@@ -0,0 +1,206 @@
+import threading
+import time
+
+import psycopg2
+
+from django.db import connection
+
+from core.backends.postgresql_pool import pool as pool_module
+from core.backends.postgresql_pool.pool import (
+    ConnectionPool,
+    PoolTimeout,
+    get_pool,
+)
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def connect():
+    params = connection.get_connection_params()
+    opened = []
+
+    def _connect():
+        conn = psycopg2.connect(**params)
+        conn.autocommit = True
+        opened.append(conn)
+        return conn
+
+    yield _connect
+    for conn in opened:
+        conn.close()
+
+
+def backend_pid(conn):
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+class TestConnectionPool:
+
+    def test_reuses_returned_connections(self, connect):
+        pool = ConnectionPool()
+        conn = pool.checkout(connect)
+        pool.checkin(conn)
+
+        assert pool.checkout(connect) is conn
+        assert pool.stats()['opened'] == 1
+        assert pool.stats()['checkouts'] == 2
+
+    def test_times_out_when_exhausted(self, connect):
+        pool = ConnectionPool(max_size=1, timeout=0.1)
+        pool.checkout(connect)
+
+        with pytest.raises(PoolTimeout):
+            pool.checkout(connect)
+
+        assert pool.stats()['timeouts'] == 1
+        assert pool.stats()['size'] == 1
+
+    def test_waits_for_a_returned_connection(self, connect):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        conn = pool.checkout(connect)
+        timer = threading.Timer(0.2, pool.checkin, [conn])
+        timer.start()
+
+        assert pool.checkout(connect) is conn
+
+        timer.join()
+        stats = pool.stats()
+        assert stats['waits'] == 1
+        assert stats['max_wait_time'] >= 0.1
+        assert stats['wait_time'] >= stats['max_wait_time']
+
+    def test_replaces_connections_failing_health_check(self, connect):
+        pool = ConnectionPool(health_check_idle=0)
+        conn = pool.checkout(connect)
+        pid = backend_pid(conn)
+        pool.checkin(conn)
+        with connect().cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        time.sleep(0.1)
+
+        replacement = pool.checkout(connect)
+
+        assert replacement is not conn
+        assert backend_pid(replacement) != pid
+        assert pool.stats()['health_check_failures'] == 1
+        assert pool.stats()['size'] == 1
+
+    def test_replaces_connections_past_max_lifetime(self, connect):
+        pool = ConnectionPool(max_lifetime=0)
+        conn = pool.checkout(connect)
+
+        pool.checkin(conn)
+
+        assert conn.closed
+        assert pool.stats()['expired'] == 1
+        assert pool.checkout(connect) is not conn
+
+    def test_rolls_back_open_transactions_on_checkin(self, connect):
+        pool = ConnectionPool()
+        conn = pool.checkout(connect)
+        conn.autocommit = False
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        pool.checkin(conn)
+
+        assert conn.info.transaction_status == (
+            psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        )
+        assert pool.checkout(connect) is conn
+
+    def test_clears_session_state_on_checkin(self, connect):
+        pool = ConnectionPool()
+        conn = pool.checkout(connect)
+        with conn.cursor() as cursor:
+            cursor.execute("SET statement_timeout = '1s'")
+            cursor.execute('CREATE TEMPORARY TABLE scratch (id int)')
+        conn.autocommit = False
+        with conn.cursor('held', withhold=True) as cursor:
+            cursor.execute('SELECT 1')
+        conn.commit()
+
+        pool.checkin(conn)
+
+        assert pool.checkout(connect) is conn
+        with conn.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            assert cursor.fetchone()[0] == '0'
+            cursor.execute("SELECT to_regclass('pg_temp.scratch')")
+            assert cursor.fetchone()[0] is None
+            cursor.execute('SELECT count(*) FROM pg_cursors')
+            assert cursor.fetchone()[0] == 0
+
+    def test_ignores_connections_after_fork(self, connect, monkeypatch):
+        pool = ConnectionPool()
+        conn = pool.checkout(connect)
+        monkeypatch.setattr(pool_module.os, 'getpid', lambda: pool.pid + 1)
+
+        pool.checkin(conn)
+        pool.discard(conn)
+
+        assert not conn.closed
+        assert pool.stats()['idle'] == 0
+
+    def test_pools_are_per_process(self, monkeypatch):
+        parent = get_pool('test', ConnectionPool)
+        assert get_pool('test', ConnectionPool) is parent
+
+        monkeypatch.setattr(pool_module.os, 'getpid', lambda: parent.pid + 1)
+
+        assert get_pool('test', ConnectionPool) is not parent
+
+    def test_keeps_min_size_open(self, connect):
+        pool = ConnectionPool(min_size=2, max_idle=0)
+        pool.fill(connect)
+
+        assert pool.stats()['idle'] == 2
+        conn = pool.checkout(connect)
+        pool.checkin(conn)
+        assert pool.stats()['size'] == 2
+
+    def test_closes_idle_connections_beyond_min_size(self, connect):
+        pool = ConnectionPool(max_idle=0)
+        conn = pool.checkout(connect)
+
+        pool.checkin(conn)
+
+        assert conn.closed
+        assert pool.stats()['size'] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPooledBackend:
+
+    def test_closed_connections_are_reused(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        opened = connection.pool_stats()['opened']
+
+        connection.close()
+        connection.ensure_connection()
+
+        assert connection.connection is raw
+        assert connection.pool_stats()['opened'] == opened
+
+    def test_threads_get_their_own_connections(self):
+        connection.ensure_connection()
+        seen = []
+
+        def query():
+            from django.db import connection as thread_connection
+            with thread_connection.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                seen.append(cursor.fetchone()[0])
+            thread_connection.close()
+
+        thread = threading.Thread(target=query)
+        thread.start()
+        thread.join()
+
+        assert seen and seen[0] != backend_pid(connection.connection)
@@ -50,21 +50,21 @@ class RecipeFactory(DjangoModelFactory):
             elif isinstance(item, models.Tag):
                 self.tags.add(item)
             elif isinstance(item, models.Like):
-                self.likes_count.add(item)
+                self.like_recipe(item.user)
 
 
 class IngredientsFactory(DjangoModelFactory):
     class Meta:
         model = models.Ingredient
 
-    name = factory.Faker("pystr", min_chars=1, max_chars=5)
+    name = factory.Sequence(lambda n: f"ingredient-{n}")
     user = factory.SubFactory(UserFactory)
 
 class TagsFactory(DjangoModelFactory):
     class Meta:
         model = models.Tag
 
-    name = factory.Faker("pystr", min_chars=1, max_chars=5)
+    name = factory.Sequence(lambda n: f"tag-{n}")
     user = factory.SubFactory(UserFactory)
 
 class LikeFactory(DjangoModelFactory):
@@ -49,6 +49,16 @@ class TestsTagsWAuth:
         ingredient.refresh_from_db()
         assert ingredient.name == payload["name"]
 
+    def test_rename_to_existing_ingredient_rejected(self, auth_client, user):
+        ingredient, other = test_factory.IngredientsFactory.create_batch(
+            2, user=user
+        )
+        url = detail_url("ingredient", ingredient.id)
+        res = auth_client.patch(url, {'name': other.name})
+        assert res.status_code == 400
+        assert 'name' in res.data
+        ingredient.refresh_from_db()
+        assert ingredient.name != other.name
 
     def test_delete_ingredient(self, auth_client, user):
         ingredient = test_factory.IngredientsFactory.create(user=user)
@@ -77,3 +87,17 @@ class TestsTagsWAuth:
 
         res = auth_client.get(INGREDIENTS_URL, {'assigned_only': 1})
         assert len(res.data) == 1
+
+    def test_fuzzy_ingredient_lookup_ranked(self, auth_client, user):
+        tomato = test_factory.IngredientsFactory.create(
+            user=user, name='Tomato'
+        )
+        paste = test_factory.IngredientsFactory.create(
+            user=user, name='Tomato paste'
+        )
+        test_factory.IngredientsFactory.create(user=user, name='Garlic')
+        res = auth_client.get(INGREDIENTS_URL, {'fuzzy': 'tomatoe'})
+        assert res.status_code == 200
+        assert [ingredient['id'] for ingredient in res.data] == [
+            tomato.id, paste.id,
+        ]
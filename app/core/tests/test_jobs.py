@@ -0,0 +1,147 @@
+import io
+from datetime import timedelta
+
+import psycopg2
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from core import jobs
+from core.management.commands import run_worker
+from core.models import Job
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def explode():
+    raise ValueError('boom')
+
+
+@pytest.fixture(autouse=True)
+def calls():
+    CALLS.clear()
+    yield CALLS
+    CALLS.clear()
+
+
+class TestJobs:
+
+    def test_enqueue_and_run(self, calls):
+        job = jobs.enqueue(record, value=3)
+        assert job.name == 'core.tests.test_jobs.record'
+        assert jobs.work() == 1
+        assert calls == [3]
+        assert not Job.objects.exists()
+
+    def test_enqueue_rolled_back_with_transaction(self):
+        with pytest.raises(ValueError):
+            with transaction.atomic():
+                jobs.enqueue(record, value=1)
+                raise ValueError
+        assert not Job.objects.exists()
+
+    def test_future_jobs_wait(self, calls):
+        jobs.enqueue(
+            record, value=1, run_at=timezone.now() + timedelta(hours=1)
+        )
+        assert jobs.work() == 0
+        assert calls == []
+
+    def test_failure_retried_with_backoff(self):
+        job = jobs.enqueue(explode, max_attempts=2)
+        jobs.work()
+        job.refresh_from_db()
+        assert job.status == Job.QUEUED
+        assert job.attempts == 1
+        assert job.run_at > timezone.now()
+        assert 'ValueError: boom' in job.last_error
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.work()
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+
+    def test_retry_delay_grows(self):
+        assert jobs.retry_delay(1) <= jobs.RETRY_BASE_DELAY
+        assert jobs.retry_delay(4) >= jobs.RETRY_BASE_DELAY * 4
+        assert jobs.retry_delay(50) <= jobs.RETRY_MAX_DELAY
+
+    def test_expired_claim_reclaimed(self, calls):
+        job = jobs.enqueue(record, value=1)
+        claimed, = jobs.claim()
+        assert jobs.claim() == []
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        reclaimed, = jobs.claim()
+        assert reclaimed.attempts == 2
+        # The first worker lost the job, its outcome is ignored.
+        jobs.run(claimed)
+        assert Job.objects.filter(pk=job.pk).exists()
+        jobs.run(reclaimed)
+        assert not Job.objects.filter(pk=job.pk).exists()
+
+    def test_expired_claim_out_of_attempts_fails(self):
+        job = jobs.enqueue(record, value=1, max_attempts=1)
+        jobs.claim()
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        assert jobs.claim() == []
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWorker:
+
+    def test_locked_jobs_skipped(self):
+        job = jobs.enqueue(record, value=1)
+        other = psycopg2.connect(**connection.get_connection_params())
+        try:
+            with other.cursor() as cursor:
+                cursor.execute(
+                    'SELECT id FROM core_job WHERE id = %s FOR UPDATE',
+                    [job.pk],
+                )
+                assert jobs.claim() == []
+        finally:
+            other.close()
+        assert len(jobs.claim()) == 1
+
+    def test_run_worker_concurrently(self, calls):
+        for value in range(20):
+            jobs.enqueue(record, value=value)
+        out = io.StringIO()
+        call_command(
+            'run_worker', '--burst', '--concurrency', '4', '--batch-size', '2',
+            stdout=out,
+        )
+        assert sorted(calls) == list(range(20))
+        assert 'Processed 20 jobs.' in out.getvalue()
+        assert not Job.objects.exists()
+
+    def test_worker_survives_database_errors(self, calls, monkeypatch):
+        jobs.enqueue(record, value=1)
+        work = jobs.work
+        failures = [OperationalError('server closed the connection')] * 2
+
+        def flaky_work(*args):
+            if failures:
+                raise failures.pop()
+            return work(*args)
+
+        monkeypatch.setattr(jobs, 'work', flaky_work)
+        monkeypatch.setattr(run_worker, 'ERROR_BASE_DELAY', 0)
+        call_command('run_worker', '--burst', stdout=io.StringIO())
+        assert calls == [1]
@@ -0,0 +1,102 @@
+from urllib.parse import urlparse
+
+from django.urls import reverse
+
+from core.tests import test_factory
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+CONTENT = b'0123456789'
+
+
+@pytest.fixture
+def media_file(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    path = tmp_path / 'uploads' / 'recipe' / 'ab' / 'abcd.png'
+    path.parent.mkdir(parents=True)
+    path.write_bytes(CONTENT)
+    return 'uploads/recipe/ab/abcd.png'
+
+
+def media_url(name):
+    return reverse('media', args=[name])
+
+
+def body(res):
+    return b''.join(res.streaming_content)
+
+
+class TestServeMedia:
+
+    def test_full_file_cached_forever(self, api_client, media_file):
+        res = api_client.get(media_url(media_file))
+        assert res.status_code == 200
+        assert body(res) == CONTENT
+        assert res['Content-Type'] == 'image/png'
+        assert res['Content-Length'] == str(len(CONTENT))
+        assert 'immutable' in res['Cache-Control']
+        assert res['ETag']
+
+    def test_if_none_match(self, api_client, media_file):
+        etag = api_client.get(media_url(media_file))['ETag']
+        res = api_client.get(media_url(media_file), HTTP_IF_NONE_MATCH=etag)
+        assert res.status_code == 304
+        assert res['ETag'] == etag
+
+    @pytest.mark.parametrize('header, expected, content_range', [
+        ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+        ('bytes=7-', b'789', 'bytes 7-9/10'),
+        ('bytes=-3', b'789', 'bytes 7-9/10'),
+        ('bytes=8-100', b'89', 'bytes 8-9/10'),
+    ])
+    def test_range(
+        self, api_client, media_file, header, expected, content_range,
+    ):
+        res = api_client.get(media_url(media_file), HTTP_RANGE=header)
+        assert res.status_code == 206
+        assert body(res) == expected
+        assert res['Content-Length'] == str(len(expected))
+        assert res['Content-Range'] == content_range
+
+    def test_unsatisfiable_range(self, api_client, media_file):
+        res = api_client.get(media_url(media_file), HTTP_RANGE='bytes=10-')
+        assert res.status_code == 416
+        assert res['Content-Range'] == 'bytes */10'
+
+    def test_stale_if_range_sends_whole_file(self, api_client, media_file):
+        res = api_client.get(
+            media_url(media_file),
+            HTTP_RANGE='bytes=2-5',
+            HTTP_IF_RANGE='"old"',
+        )
+        assert res.status_code == 200
+        assert body(res) == CONTENT
+
+    def test_accel_redirect(self, api_client, media_file, settings):
+        settings.MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+        res = api_client.get(media_url(media_file))
+        assert res.status_code == 200
+        assert res['X-Accel-Redirect'] == f'/protected-media/{media_file}'
+        assert res.content == b''
+
+    @pytest.mark.parametrize('name', [
+        'uploads/missing.png',
+        '../etc/passwd',
+        'uploads',
+    ])
+    def test_not_found(self, api_client, media_file, name):
+        assert api_client.get(media_url(name)).status_code == 404
+
+    def test_recipe_image_url_served(
+        self, auth_client, user, settings, tmp_path,
+    ):
+        settings.MEDIA_ROOT = str(tmp_path)
+        recipe = test_factory.RecipeFactory.create(user=user)
+        res = auth_client.get(
+            reverse('recipe:recipe-detail', args=[recipe.id])
+        )
+        image = auth_client.get(urlparse(res.data['image']).path)
+        assert image.status_code == 200
+        assert body(image) == recipe.image.read()
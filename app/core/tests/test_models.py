@@ -1,4 +1,8 @@
+import hashlib
+import os
 from unittest.mock import patch
+
+from django.core.files.base import ContentFile
 from django.urls import reverse
 from core.tests import test_factory
 
@@ -6,6 +10,7 @@ from django.contrib.auth import get_user_model
 from decimal import Decimal
 
 from core import models
+from core.storage import ContentAddressedStorage
 import pytest
 pytestmark = pytest.mark.django_db
 
@@ -63,9 +68,63 @@ class TestsModel:
         ingredient = test_factory.IngredientsFactory.create(user=user)
         assert str(ingredient) == ingredient.name
 
+    def test_tombstone_records_big_ids(self):
+        user = test_factory.UserFactory.create()
+        tag = models.Tag(pk=2 ** 40, user=user, name='Gone')
+
+        models.Tombstone.objects.record([tag])
+
+        assert models.Tombstone.objects.get().object_id == 2 ** 40
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         uuid = 'test-uuid'
         mock_uuid.return_value = uuid
         file_path = models.recipe_image_file_path(None, 'example.jpg')
         assert file_path == f'uploads/recipe/{uuid}.jpg'
+
+
+class TestContentAddressedStorage:
+
+    def test_same_content_stored_once(self, tmp_path):
+        storage = ContentAddressedStorage(location=tmp_path)
+        digest = hashlib.sha256(b'pixels').hexdigest()
+        first = storage.save('uploads/recipe/a.PNG', ContentFile(b'pixels'))
+        second = storage.save('uploads/recipe/b.png', ContentFile(b'pixels'))
+        assert first == second == f'uploads/recipe/{digest[:2]}/{digest}.png'
+        assert os.listdir(tmp_path / 'uploads' / 'recipe' / digest[:2]) == [
+            f'{digest}.png'
+        ]
+        assert storage.open(first).read() == b'pixels'
+
+    def test_different_content_stored_apart(self, tmp_path):
+        storage = ContentAddressedStorage(location=tmp_path)
+        first = storage.save('a.png', ContentFile(b'one'))
+        second = storage.save('a.png', ContentFile(b'two'))
+        assert first != second
+
+
+class TestImageBlobRefcount:
+
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+
+    def blob(self, recipe):
+        return models.ImageBlob.objects.get(name=recipe.image.name)
+
+    def test_recipes_share_blob(self):
+        first = test_factory.RecipeFactory.create()
+        second = test_factory.RecipeFactory.create()
+        assert first.image.name == second.image.name
+        assert self.blob(first).ref_count == 2
+
+        first.delete()
+        assert self.blob(second).ref_count == 1
+
+    def test_replaced_image_released(self):
+        recipe = test_factory.RecipeFactory.create()
+        old_name = recipe.image.name
+        recipe.image.save('new.png', ContentFile(b'other'))
+        assert models.ImageBlob.objects.get(name=old_name).ref_count == 0
+        assert self.blob(recipe).ref_count == 1
@@ -1,15 +1,26 @@
+import csv
+import hashlib
+import io
 import os
 import tempfile
 import json
+from urllib.parse import parse_qs, urlparse
 
 from PIL import Image
-
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from django.contrib.postgres.search import SearchQuery
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.urls import reverse
 from django.urls import reverse
 
 from core.tests import test_factory
-from recipe import serializers
+from recipe import placeholders, renditions, serializers, views
 from core import models
 
 import pytest
@@ -23,6 +34,21 @@ INGREDIENTS_URL = reverse('recipe:ingredient-list')
 TAGS_URL = reverse('recipe:tag-list')
 RECIPES_URL = reverse('recipe:recipe-list')
 
+# One query computes the ETag, the rest render the response.
+RECIPE_LIST_QUERY_BUDGET = 4
+RECIPE_DETAIL_QUERY_BUDGET = 4
+RECIPE_NOT_MODIFIED_QUERY_BUDGET = 1
+RECIPE_WRITE_QUERY_BUDGET = 13
+RECIPE_LIKE_QUERY_BUDGET = 1
+RECIPE_UPLOAD_IMAGE_QUERY_BUDGET = 3
+RECIPE_EXPORT_QUERY_BUDGET = 3
+RECIPE_IMPORT_QUERY_BUDGET = 7
+LIKES_URL = reverse('recipe:like-list')
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
 def detail_url(model_name, item_id):
     return reverse(f"recipe:{model_name}-detail", args=[item_id])
 
@@ -326,20 +352,58 @@ class TestIngredientsViewsWAuth:
 
     def test_like_recipe(self, user):
         recipe = test_factory.RecipeFactory.create(user = user, title = 'test like')
-        like = test_factory.LikeFactory.create(user = user, recipe=recipe)
-        initial_like_count = recipe.likes_count.count()
-        recipe.likes_count.add(like)
-        updated_like_count = recipe.likes_count.count()
-        assert updated_like_count == initial_like_count + 1
+        assert recipe.like_recipe(user) is True
+        assert recipe.like_recipe(user) is False
+        recipe.refresh_from_db()
+        assert recipe.likes_count == 1
+        assert models.Like.objects.filter(recipe=recipe).count() == 1
 
     def test_unlike_recipe(self, user):
         recipe = test_factory.RecipeFactory.create(user = user, title = 'test like')
-        like = test_factory.LikeFactory.create(user = user, recipe=recipe)
-        recipe.likes_count.add(like)
-        initial_like_count = recipe.likes_count.count()
-        recipe.likes_count.filter(user=user).delete()
-        updated_like_count = recipe.likes_count.count()
-        assert updated_like_count == initial_like_count - 1
+        recipe.like_recipe(user)
+        assert recipe.unlike_recipe(user) is True
+        assert recipe.unlike_recipe(user) is False
+        recipe.refresh_from_db()
+        assert recipe.likes_count == 0
+        assert not models.Like.objects.filter(recipe=recipe).exists()
+
+    def test_like_endpoint_updates_counter(self, auth_client, user):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        res = auth_client.post(LIKES_URL, {'recipe': recipe.id})
+        assert res.status_code == 201
+        res = auth_client.post(LIKES_URL, {'recipe': recipe.id})
+        assert res.status_code == 400
+        res = auth_client.get(detail_url("recipe", recipe.id))
+        assert res.data['likes_count'] == 1
+
+        res = auth_client.delete(detail_url("like", recipe.id))
+        assert res.status_code == 200
+        recipe.refresh_from_db()
+        assert recipe.likes_count == 0
+
+    def test_like_missing_recipe(self, auth_client):
+        res = auth_client.post(LIKES_URL, {'recipe': 0})
+        assert res.status_code == 404
+        res = auth_client.delete(detail_url("like", 0))
+        assert res.status_code == 404
+
+    def test_like_and_unlike_single_statement(
+        self, auth_client, user, assert_query_budget,
+    ):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with assert_query_budget(RECIPE_LIKE_QUERY_BUDGET):
+            res = auth_client.post(LIKES_URL, {'recipe': recipe.id})
+        assert res.data['likes_count'] == 1
+        with assert_query_budget(RECIPE_LIKE_QUERY_BUDGET):
+            res = auth_client.delete(detail_url("like", recipe.id))
+        assert res.data['likes_count'] == 0
+
+    def test_duplicate_like_rejected_by_constraint(self, user):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        models.Like.objects.create(user=user, recipe=recipe)
+        with pytest.raises(IntegrityError):
+            with transaction.atomic():
+                models.Like.objects.create(user=user, recipe=recipe)
 
     def test_filter_by_tags_or_by_ingredients(self, auth_client, user):
         tags = test_factory.TagsFactory.create_batch(3, user=user)
@@ -375,11 +439,615 @@ class TestIngredientsViewsWAuth:
         assert serializers.RecipeSerializer(recipes[2]).data not in response_data_ing
 
 
+class TestRecipeQueryBudget:
+
+    def _create_recipes(self, user, count):
+        tags = test_factory.TagsFactory.create_batch(2, user=user)
+        ingredients = test_factory.IngredientsFactory.create_batch(
+            2, user=user
+        )
+        return test_factory.RecipeFactory.create_batch(
+            count, user=user, ingredients_and_tags_and_likes=tags + ingredients
+        )
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test_list_query_budget(
+        self, api_client, user, assert_query_budget, count,
+    ):
+        self._create_recipes(user, count)
+        with assert_query_budget(RECIPE_LIST_QUERY_BUDGET):
+            res = api_client.get(RECIPES_URL)
+        assert res.status_code == 200
+        assert len(res.data) == count
+        assert all(len(recipe['tags']) == 2 for recipe in res.data)
+
+    @pytest.mark.parametrize('count', [1, 30])
+    def test_create_query_budget(
+        self, auth_client, user, assert_query_budget, count,
+    ):
+        test_factory.TagsFactory.create(user=user, name='existing-tag')
+        payload = {
+            'title': 'Stew',
+            'time_minutes': 60,
+            'price': '4.50',
+            'tags': [{'name': 'existing-tag'}] + [
+                {'name': f'new-tag-{i}'} for i in range(count)
+            ],
+            'ingredients': [{'name': f'ingredient-{i}'} for i in range(count)],
+        }
+        with assert_query_budget(RECIPE_WRITE_QUERY_BUDGET):
+            res = auth_client.post(RECIPES_URL, payload, format='json')
+        assert res.status_code == 201
+        recipe = models.Recipe.objects.get(id=res.data['id'])
+        assert recipe.tags.count() == count + 1
+        assert recipe.ingredients.count() == count
+        assert models.Tag.objects.filter(user=user).count() == count + 1
+
+    def test_duplicate_names_resolved_once(self, auth_client, user):
+        payload = {
+            'title': 'Stew',
+            'time_minutes': 60,
+            'price': '4.50',
+            'tags': [{'name': 'soup'}, {'name': 'soup'}],
+        }
+        res = auth_client.post(RECIPES_URL, payload, format='json')
+        assert res.status_code == 201
+        assert models.Tag.objects.filter(user=user, name='soup').count() == 1
+
+    def test_update_writes_only_the_delta(self, auth_client, user):
+        tags = test_factory.TagsFactory.create_batch(3, user=user)
+        recipe = test_factory.RecipeFactory.create(
+            user=user, title='Stew', ingredients_and_tags_and_likes=tags
+        )
+        through_table = models.Recipe.tags.through._meta.db_table
+        payload = {
+            'title': 'Stew',
+            'tags': [
+                {'name': tags[0].name},
+                {'name': tags[1].name},
+                {'name': 'new'},
+            ],
+        }
+        with CaptureQueriesContext(connection) as context:
+            res = auth_client.patch(
+                detail_url("recipe", recipe.id), payload, format='json'
+            )
+        assert res.status_code == 200
+        writes = [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        through_writes = [
+            sql.split(' ')[0] for sql in writes if through_table in sql
+        ]
+        assert through_writes == ['DELETE', 'INSERT']
+        recipe_updates = [
+            sql for sql in writes if sql.startswith('UPDATE "core_recipe"')
+        ]
+        assert len(recipe_updates) == 1
+        assert '"title"' not in recipe_updates[0]
+        assert '"updated_at"' in recipe_updates[0]
+        assert set(recipe.tags.values_list('name', flat=True)) == {
+            tags[0].name, tags[1].name, 'new',
+        }
+        assert {tag['name'] for tag in res.data['tags']} == {
+            tags[0].name, tags[1].name, 'new',
+        }
+
+    def test_update_saves_changed_fields_only(self, auth_client, user):
+        recipe = test_factory.RecipeFactory.create(user=user, title='Stew')
+        with CaptureQueriesContext(connection) as context:
+            auth_client.patch(
+                detail_url("recipe", recipe.id),
+                {'title': 'Stew', 'time_minutes': recipe.time_minutes + 1},
+            )
+        updates = [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].startswith('UPDATE "core_recipe"')
+        ]
+        assert len(updates) == 1
+        assert '"time_minutes"' in updates[0]
+        assert '"title"' not in updates[0]
+
+    def test_detail_query_budget(self, api_client, user, assert_query_budget):
+        recipe = self._create_recipes(user, 1)[0]
+        with assert_query_budget(RECIPE_DETAIL_QUERY_BUDGET):
+            res = api_client.get(detail_url("recipe", recipe.id))
+        assert res.status_code == 200
+        assert len(res.data['ingredients']) == 2
+
+
+class TestRecipeCursorPagination:
+
+    def _create_recipes(self, user, count):
+        now = timezone.now()
+        return [
+            test_factory.RecipeFactory.create(
+                user=user, created_at=now - timezone.timedelta(minutes=i)
+            )
+            for i in range(count)
+        ]
+
+    def test_unpaginated_without_params(self, api_client, user):
+        self._create_recipes(user, 3)
+        res = api_client.get(RECIPES_URL)
+        assert res.status_code == 200
+        assert len(res.data) == 3
+
+    def test_walk_pages_newest_first(self, api_client, user):
+        recipes = self._create_recipes(user, 5)
+        seen = []
+        res = api_client.get(RECIPES_URL, {'page_size': 2})
+        assert res.data['previous'] is None
+        while True:
+            assert res.status_code == 200
+            seen += [item['id'] for item in res.data['results']]
+            if res.data['next'] is None:
+                break
+            res = api_client.get(res.data['next'])
+        assert seen == [recipe.id for recipe in recipes]
+
+    def test_same_created_at_ordered_by_id(self, api_client, user):
+        created_at = timezone.now()
+        recipes = test_factory.RecipeFactory.create_batch(
+            3, user=user, created_at=created_at
+        )
+        first = api_client.get(RECIPES_URL, {'page_size': 2})
+        second = api_client.get(first.data['next'])
+        results = first.data['results'] + second.data['results']
+        ids = [item['id'] for item in results]
+        assert ids == sorted((recipe.id for recipe in recipes), reverse=True)
+
+    def test_stable_under_concurrent_inserts(self, api_client, user):
+        recipes = self._create_recipes(user, 4)
+        first = api_client.get(RECIPES_URL, {'page_size': 2})
+        test_factory.RecipeFactory.create(user=user)
+        second = api_client.get(first.data['next'])
+        assert [item['id'] for item in second.data['results']] == [
+            recipe.id for recipe in recipes[2:]
+        ]
+
+    def test_previous_link(self, api_client, user):
+        recipes = self._create_recipes(user, 5)
+        first = api_client.get(RECIPES_URL, {'page_size': 2})
+        second = api_client.get(first.data['next'])
+        back = api_client.get(second.data['previous'])
+        assert [item['id'] for item in back.data['results']] == [
+            recipe.id for recipe in recipes[:2]
+        ]
+        assert back.data['previous'] is None
+
+    def test_invalid_cursor(self, api_client):
+        res = api_client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+        assert res.status_code == 404
+
+
+class TestRecipeSearch:
+
+    def test_search_title_and_description(self, api_client, user):
+        by_title = test_factory.RecipeFactory.create(
+            user=user, title='Roasted tomatoes', description='Slow oven.'
+        )
+        by_description = test_factory.RecipeFactory.create(
+            user=user, title='Summer salad',
+            description='Fresh tomato and basil.',
+        )
+        test_factory.RecipeFactory.create(
+            user=user, title='Lentil soup', description='Hearty and warm.'
+        )
+        res = api_client.get(RECIPES_URL, {'search': 'tomato'})
+        assert res.status_code == 200
+        assert [item['id'] for item in res.data] == [
+            by_title.id, by_description.id,
+        ]
+
+    def test_search_vector_updated_on_write(self, user):
+        recipe = test_factory.RecipeFactory.create(user=user, title='Pancakes')
+        recipe.title = 'Waffles'
+        recipe.save()
+
+        def matches(term):
+            query = SearchQuery(term, config=models.RECIPE_SEARCH_CONFIG)
+            return models.Recipe.objects.filter(search_vector=query).exists()
+        assert matches('waffle')
+        assert not matches('pancake')
+
+    def test_search_pages_ordered_by_rank(self, api_client, user):
+        weaker = test_factory.RecipeFactory.create_batch(
+            2, user=user, title='Salad', description='Add tomato.'
+        )
+        stronger = test_factory.RecipeFactory.create_batch(
+            2, user=user, title='Tomato tart', description='Tomato on pastry.'
+        )
+        seen = []
+        res = api_client.get(RECIPES_URL, {'search': 'tomato', 'page_size': 1})
+        while True:
+            assert res.status_code == 200
+            seen += [item['id'] for item in res.data['results']]
+            if res.data['next'] is None:
+                break
+            res = api_client.get(res.data['next'])
+        assert seen == [recipe.id for recipe in stronger[::-1] + weaker[::-1]]
+
+    def test_search_rejects_cursor(self, api_client, user):
+        test_factory.RecipeFactory.create_batch(3, user=user)
+        first = api_client.get(RECIPES_URL, {'page_size': 2})
+        cursor = parse_qs(urlparse(first.data['next']).query)['cursor'][0]
+        res = api_client.get(
+            RECIPES_URL, {'search': 'tomato', 'cursor': cursor}
+        )
+        assert res.status_code == 400
+        assert 'cursor' in res.data
+
+    def test_trigger_uses_search_config(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_get_functiondef("
+                "'core_recipe_search_vector_update'::regproc)"
+            )
+            definition, = cursor.fetchone()
+        config = f"'pg_catalog.{models.RECIPE_SEARCH_CONFIG}'"
+        assert definition.count(config) == 2
+
+    def test_title_param_is_search_alias(self, api_client, user):
+        recipe = test_factory.RecipeFactory.create(
+            user=user, title='Mushroom risotto'
+        )
+        test_factory.RecipeFactory.create(user=user, title='Apple pie')
+        res = api_client.get(RECIPES_URL, {'title': 'risotto'})
+        assert [item['id'] for item in res.data] == [recipe.id]
+
+
+class TestRecipeFuzzyLookup:
+
+    def test_fuzzy_title_lookup(self, api_client, user):
+        recipe = test_factory.RecipeFactory.create(
+            user=user, title='Spaghetti carbonara'
+        )
+        test_factory.RecipeFactory.create(user=user, title='Chicken curry')
+        res = api_client.get(RECIPES_URL, {'fuzzy': 'spagetti carbonara'})
+        assert res.status_code == 200
+        assert [item['id'] for item in res.data] == [recipe.id]
+
+    def test_fuzzy_lookup_limited_to_top_matches(self, api_client, user):
+        test_factory.RecipeFactory.create_batch(12, user=user, title='Pizza')
+        res = api_client.get(RECIPES_URL, {'fuzzy': 'piza', 'page_size': 50})
+        assert res.status_code == 200
+        assert len(res.data) == views.RecipeViewSet.fuzzy_limit
+
+
+class TestRecipeImport:
+    IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+    def _import(self, client, lines, **params):
+        url = self.IMPORT_URL
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+        body = '\n'.join(
+            line if isinstance(line, str) else json.dumps(line)
+            for line in lines
+        )
+        res = client.post(url, data=body, content_type='application/x-ndjson')
+        results = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        return res, results
+
+    def _recipe(self, title, **extra):
+        return dict(title=title, time_minutes=10, price='2.50', **extra)
+
+    def test_import_reports_each_line(self, auth_client, user):
+        test_factory.TagsFactory.create(user=user, name='vegan')
+        lines = [
+            self._recipe('Soup', tags=[{'name': 'vegan'}, {'name': 'warm'}]),
+            '{not json',
+            self._recipe('Salad', ingredients=[{'name': 'lettuce'}]),
+            {'title': 'Missing fields'},
+            self._recipe('Stew', tags=[{'name': 'warm'}]),
+        ]
+        res, results = self._import(auth_client, lines, batch_size=2)
+        assert res.status_code == 200
+        assert [result["line"] for result in results] == [1, 2, 3, 4, 5]
+        errors = {result['line'] for result in results if 'errors' in result}
+        assert errors == {2, 4}
+
+        created = {
+            result['line']: result['id'] for result in results
+            if 'id' in result
+        }
+        soup = models.Recipe.objects.get(id=created[1])
+        assert soup.user == user
+        soup_tags = soup.tags.values_list('name', flat=True)
+        assert set(soup_tags) == {'vegan', 'warm'}
+        assert models.Tag.objects.filter(user=user, name='warm').count() == 1
+        salad = models.Recipe.objects.get(id=created[3])
+        salad_ingredients = salad.ingredients.values_list('name', flat=True)
+        assert list(salad_ingredients) == ['lettuce']
+
+    def test_import_reports_only_rows_that_fail_to_save(
+        self, auth_client, monkeypatch,
+    ):
+        create = serializers.RecipeListSerializer.create
+
+        def failing_create(self, validated_data):
+            if any(data['title'] == 'Broken' for data in validated_data):
+                raise DatabaseError('simulated failure')
+            return create(self, validated_data)
+
+        monkeypatch.setattr(
+            serializers.RecipeListSerializer, 'create', failing_create,
+        )
+        lines = [
+            self._recipe('Soup'), self._recipe('Broken'), self._recipe('Stew'),
+        ]
+
+        res, results = self._import(auth_client, lines)
+
+        assert [result['line'] for result in results] == [1, 2, 3]
+        assert 'id' in results[0] and 'id' in results[2]
+        assert results[1]['errors'] == ['Could not be saved.']
+        assert models.Recipe.objects.filter(
+            title__in=['Soup', 'Stew']
+        ).count() == 2
+
+    def test_import_queries_do_not_grow_with_lines(self, auth_client):
+        def count_queries(total):
+            lines = [
+                self._recipe(f'Recipe {i}', tags=[{'name': f'tag-{i}'}])
+                for i in range(total)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                self._import(auth_client, lines)
+            return len(context.captured_queries)
+        assert count_queries(2) == count_queries(20)
+
+    @pytest.mark.parametrize('count', [1, 20])
+    def test_import_query_budget(
+        self, auth_client, assert_query_budget, count,
+    ):
+        lines = [
+            self._recipe(f'Recipe {i}', tags=[{'name': f'tag-{i}'}])
+            for i in range(count)
+        ]
+        with assert_query_budget(RECIPE_IMPORT_QUERY_BUDGET):
+            res, results = self._import(auth_client, lines)
+        assert res.status_code == 200
+        assert all('id' in result for result in results)
+
+    def test_import_requires_authentication(self, api_client):
+        res = api_client.post(
+            self.IMPORT_URL, data='{}', content_type='application/x-ndjson'
+        )
+        assert res.status_code == 401
+
+
+class TestRecipeExport:
+    EXPORT_URL = reverse('recipe:recipe-export')
+
+    def _create_recipes(self, user, count):
+        tag = test_factory.TagsFactory.create(user=user, name='quick')
+        ingredient = test_factory.IngredientsFactory.create(
+            user=user, name='egg'
+        )
+        return test_factory.RecipeFactory.create_batch(
+            count, user=user, ingredients_and_tags_and_likes=[tag, ingredient]
+        )
+
+    def test_export_ndjson(self, auth_client, user, monkeypatch):
+        monkeypatch.setattr(views.RecipeViewSet, 'export_chunk_size', 2)
+        recipes = self._create_recipes(user, 5)
+        test_factory.RecipeFactory.create()
+        res = auth_client.get(self.EXPORT_URL)
+        assert res.status_code == 200
+        assert res.streaming
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        assert [row['id'] for row in rows] == [recipe.id for recipe in recipes]
+        assert all(row['tags'] == ['quick'] for row in rows)
+        assert all(row['ingredients'] == ['egg'] for row in rows)
+
+    def test_export_csv(self, auth_client, user):
+        recipes = self._create_recipes(user, 2)
+        res = auth_client.get(self.EXPORT_URL, {'output': 'csv'})
+        assert res['Content-Type'] == 'text/csv'
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(content.splitlines()))
+        assert [int(row['id']) for row in rows] == [
+            recipe.id for recipe in recipes
+        ]
+        assert rows[0]['tags'] == 'quick'
+        assert rows[0]['title'] == recipes[0].title
+
+    def test_export_queries_do_not_grow_with_rows(self, auth_client, user):
+        def count_queries(total):
+            models.Recipe.objects.all().delete()
+            models.Tag.objects.all().delete()
+            models.Ingredient.objects.all().delete()
+            self._create_recipes(user, total)
+            with CaptureQueriesContext(connection) as context:
+                b''.join(auth_client.get(self.EXPORT_URL).streaming_content)
+            return len(context.captured_queries)
+        assert count_queries(2) == count_queries(12)
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test_export_query_budget(
+        self, auth_client, user, assert_query_budget, count,
+    ):
+        self._create_recipes(user, count)
+        with assert_query_budget(RECIPE_EXPORT_QUERY_BUDGET):
+            res = auth_client.get(self.EXPORT_URL)
+            content = b''.join(res.streaming_content)
+        assert len(content.splitlines()) == count
+
+    def test_export_requires_authentication(self, api_client):
+        assert api_client.get(self.EXPORT_URL).status_code == 401
+
+    def test_export_unknown_output(self, auth_client):
+        res = auth_client.get(self.EXPORT_URL, {'output': 'xml'})
+        assert res.status_code == 400
+
+
+class TestRecipeResponseCache:
+
+    def test_anonymous_reads_served_from_cache(
+        self, api_client, user, assert_query_budget,
+    ):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        first_list = api_client.get(RECIPES_URL, {'a': 1, 'b': 2})
+        first_detail = api_client.get(detail_url("recipe", recipe.id))
+        with assert_query_budget(0):
+            cached_list = api_client.get(RECIPES_URL, {'b': 2, 'a': 1})
+            cached_detail = api_client.get(detail_url("recipe", recipe.id))
+        assert cached_list.data == first_list.data
+        assert cached_detail.data == first_detail.data
+
+    def test_authenticated_reads_not_cached(self, auth_client, user):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        auth_client.get(detail_url("recipe", recipe.id))
+        with CaptureQueriesContext(connection) as context:
+            auth_client.get(detail_url("recipe", recipe.id))
+        assert len(context.captured_queries) > 0
+
+    def test_recipe_update_invalidates(self, auth_client, user,
+                                       django_capture_on_commit_callbacks):
+        anonymous = APIClient()
+        recipe = test_factory.RecipeFactory.create(user=user, title='Old')
+        other = test_factory.RecipeFactory.create(user=user)
+        anonymous.get(RECIPES_URL)
+        anonymous.get(detail_url("recipe", recipe.id))
+        anonymous.get(detail_url("recipe", other.id))
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.patch(
+                detail_url("recipe", recipe.id), {'title': 'New'}
+            )
+        res = anonymous.get(detail_url("recipe", recipe.id))
+        assert res.data['title'] == 'New'
+        res = anonymous.get(RECIPES_URL)
+        assert 'New' in [item['title'] for item in res.data]
+        with CaptureQueriesContext(connection) as context:
+            anonymous.get(detail_url("recipe", other.id))
+        assert len(context.captured_queries) == 0
+
+    def test_like_invalidates(self, auth_client, user,
+                              django_capture_on_commit_callbacks):
+        anonymous = APIClient()
+        recipe = test_factory.RecipeFactory.create(user=user)
+        res = anonymous.get(detail_url("recipe", recipe.id))
+        assert res.data['likes_count'] == 0
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.post(LIKES_URL, {'recipe': recipe.id})
+        res = anonymous.get(detail_url("recipe", recipe.id))
+        assert res.data['likes_count'] == 1
+
+    def test_tag_rename_invalidates(self, auth_client, user,
+                                    django_capture_on_commit_callbacks):
+        anonymous = APIClient()
+        tag = test_factory.TagsFactory.create(user=user, name='old')
+        recipe = test_factory.RecipeFactory.create(
+            user=user, ingredients_and_tags_and_likes=[tag]
+        )
+        anonymous.get(detail_url("recipe", recipe.id))
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.patch(detail_url("tag", tag.id), {'name': 'new'})
+        res = anonymous.get(detail_url("recipe", recipe.id))
+        assert [item['name'] for item in res.data['tags']] == ['new']
+
+
+class TestRecipeConditionalGet:
+
+    def test_detail_not_modified(self, auth_client, user, assert_query_budget):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        res = auth_client.get(detail_url("recipe", recipe.id))
+        assert res['ETag'] and res['Last-Modified']
+        with assert_query_budget(RECIPE_NOT_MODIFIED_QUERY_BUDGET):
+            cached = auth_client.get(
+                detail_url("recipe", recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+            )
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached['ETag'] == res['ETag']
+
+    def test_list_not_modified(self, auth_client, user, assert_query_budget):
+        test_factory.RecipeFactory.create_batch(3, user=user)
+        res = auth_client.get(RECIPES_URL)
+        with assert_query_budget(RECIPE_NOT_MODIFIED_QUERY_BUDGET):
+            cached = auth_client.get(
+                RECIPES_URL, HTTP_IF_NONE_MATCH=res['ETag']
+            )
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_anonymous_not_modified_from_cache(self, api_client, user,
+                                               assert_query_budget):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        res = api_client.get(detail_url("recipe", recipe.id))
+        with assert_query_budget(0):
+            cached = api_client.get(
+                detail_url("recipe", recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+            )
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_etag_changes_with_query(self, auth_client, user):
+        test_factory.RecipeFactory.create(user=user)
+        res = auth_client.get(RECIPES_URL)
+        other = auth_client.get(
+            RECIPES_URL, {'page_size': 1}, HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        assert other.status_code == status.HTTP_200_OK
+        assert other['ETag'] != res['ETag']
+
+    def test_delete_changes_list_etag(self, auth_client, user):
+        recipes = test_factory.RecipeFactory.create_batch(2, user=user)
+        res = auth_client.get(RECIPES_URL)
+        auth_client.delete(detail_url("recipe", recipes[0].id))
+        after = auth_client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        assert after.status_code == status.HTTP_200_OK
+        assert len(after.data) == 1
+
+    def test_tag_change_updates_recipe_etag(self, auth_client, user):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        res = auth_client.get(detail_url("recipe", recipe.id))
+        auth_client.patch(
+            detail_url("recipe", recipe.id), {'tags': [{'name': 'vegan'}]},
+            format='json',
+        )
+        after = auth_client.get(
+            detail_url("recipe", recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        assert after.status_code == status.HTTP_200_OK
+        assert [tag['name'] for tag in after.data['tags']] == ['vegan']
+
+    def test_tag_rename_updates_recipe_etag(self, auth_client, user):
+        tag = test_factory.TagsFactory.create(user=user, name='old')
+        recipe = test_factory.RecipeFactory.create(
+            user=user, ingredients_and_tags_and_likes=[tag]
+        )
+        res = auth_client.get(detail_url("recipe", recipe.id))
+        auth_client.patch(detail_url("tag", tag.id), {'name': 'new'})
+        after = auth_client.get(
+            detail_url("recipe", recipe.id), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+        assert after.status_code == status.HTTP_200_OK
+
+    def test_tags_list_not_modified(
+        self, auth_client, user, assert_query_budget,
+    ):
+        test_factory.TagsFactory.create_batch(2, user=user)
+        res = auth_client.get(TAGS_URL)
+        with assert_query_budget(RECIPE_NOT_MODIFIED_QUERY_BUDGET):
+            cached = auth_client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        test_factory.TagsFactory.create(user=user)
+        after = auth_client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        assert after.status_code == status.HTTP_200_OK
+
+
 class TestsImageUpload:
     def test_upload_image(self, auth_client, recipe):
         with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
             img = Image.new('RGB', (10, 10))
-            img.save(image_file, format='JPEG')
+            img.save(image_file, format='PNG')
             image_file.seek(0)
             payload = {
             'title': recipe.title,
@@ -409,4 +1077,181 @@ class TestsImageUpload:
             assert res.status_code == 400
             assert "Only PNG images are allowed." in res.data['image'][0]
 
-        
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def png_upload(size=(2000, 1500)):
+    image_file = tempfile.NamedTemporaryFile(suffix='.png')
+    Image.new('RGB', size, 'orange').save(image_file, format='PNG')
+    image_file.seek(0)
+    return image_file
+
+
+class TestRecipeImageRenditions:
+
+    def test_upload_image_renders_renditions(
+        self, auth_client, user, media_root,
+    ):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with png_upload() as image_file:
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        assert res.status_code == 200
+        assert res.data['renditions'] == {}
+        call_command('run_worker', '--burst', stdout=io.StringIO())
+        recipe.refresh_from_db()
+        assert set(recipe.image_renditions) == set(renditions.RENDITIONS)
+        for rendition, name in recipe.image_renditions.items():
+            with Image.open(media_root / name) as image:
+                assert max(image.size) == max(renditions.RENDITIONS[rendition])
+        card = media_root / recipe.image_renditions['card']
+        assert os.path.getsize(card) < os.path.getsize(recipe.image.path)
+
+        listed = auth_client.get(RECIPES_URL).data[0]['renditions']
+        assert listed['thumbnail'].endswith(
+            recipe.image_renditions['thumbnail']
+        )
+
+    def test_upload_image_query_budget(
+        self, auth_client, user, media_root, assert_query_budget,
+    ):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with png_upload() as image_file:
+            with assert_query_budget(RECIPE_UPLOAD_IMAGE_QUERY_BUDGET):
+                res = auth_client.post(
+                    image_upload_url(recipe.id), {'image': image_file},
+                    format='multipart',
+                )
+        assert res.status_code == 200
+
+    def test_upload_image_sets_placeholder(
+        self, auth_client, user, media_root,
+    ):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with png_upload((300, 200)) as image_file:
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        dimensions = (res.data['image_width'], res.data['image_height'])
+        assert dimensions == (300, 200)
+        call_command('run_worker', '--burst', stdout=io.StringIO())
+        listed = auth_client.get(RECIPES_URL).data[0]
+        assert len(listed['image_blurhash']) == 28
+        color = bytes.fromhex(listed['image_color'][1:])
+        assert all(abs(a - b) <= 2 for a, b in zip(color, (255, 165, 0)))
+        assert (listed['image_width'], listed['image_height']) == (300, 200)
+
+    def test_blurhash_matches_reference_encoder(self):
+        image = Image.linear_gradient('L').resize((32, 32)).convert('RGB')
+        assert placeholders.blurhash(image) == (
+            'L#HetWoffQof00WBfQWBxuj[fQj[', '#808080'
+        )
+
+    def test_new_image_clears_stale_renditions(
+        self, auth_client, user, media_root,
+    ):
+        recipe = test_factory.RecipeFactory.create(
+            user=user, image_renditions={'card': 'old.card.jpg'}
+        )
+        with png_upload() as image_file:
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        assert res.data['renditions'] == {}
+
+    def test_reupload_reuses_renditions(self, auth_client, user, media_root,
+                                        monkeypatch):
+        first, second = test_factory.RecipeFactory.create_batch(2, user=user)
+        for recipe in (first, second):
+            with png_upload((300, 200)) as image_file:
+                auth_client.post(
+                    image_upload_url(recipe.id), {'image': image_file},
+                    format='multipart',
+                )
+        rendered = []
+        render = renditions.render
+        monkeypatch.setattr(
+            renditions, 'render',
+            lambda path: rendered.append(path) or render(path),
+        )
+        call_command('run_worker', '--burst', stdout=io.StringIO())
+        assert len(rendered) == 1
+
+
+class TestStreamingImageUpload:
+
+    def test_upload_streamed_to_disk_and_hashed(
+        self, auth_client, user, media_root, monkeypatch,
+    ):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        received = []
+        save = serializers.RecipeImageSerializer.save
+
+        def capture(serializer, **kwargs):
+            received.append(serializer.validated_data['image'])
+            return save(serializer, **kwargs)
+
+        monkeypatch.setattr(serializers.RecipeImageSerializer, 'save', capture)
+        with png_upload((40, 30)) as image_file:
+            digest = hashlib.sha256(image_file.read()).hexdigest()
+            image_file.seek(0)
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        assert res.status_code == 200
+        uploaded, = received
+        assert isinstance(uploaded, TemporaryUploadedFile)
+        assert uploaded.sha256 == digest
+        assert uploaded.image_dimensions == (40, 30)
+
+    def test_upload_over_size_cap_rejected(self, auth_client, user, media_root,
+                                           settings):
+        settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE = 1024
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.effect_noise((200, 200), 100).save(image_file, format='PNG')
+            image_file.seek(0)
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        assert res.status_code == 413
+
+    def test_non_png_content_rejected(self, auth_client, user, media_root):
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        assert res.status_code == 400
+        assert res.data['image'] == ['Only PNG images are allowed.']
+
+    def test_dimensions_checked_from_header(
+        self, auth_client, user, media_root, settings,
+    ):
+        settings.RECIPE_IMAGE_MAX_DIMENSION = 100
+        recipe = test_factory.RecipeFactory.create(user=user)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            header = Image.new('1', (101, 1))
+            header.save(image_file, format='PNG')
+            # Only the header is read, a truncated body is never decoded.
+            image_file.truncate(33)
+            image_file.seek(0)
+            res = auth_client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart',
+            )
+        assert res.status_code == 400
+        assert 'must not exceed 100 pixels' in res.data['image'][0]
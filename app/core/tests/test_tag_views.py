@@ -52,6 +52,14 @@ class TestsTagsWAuth:
         tag.refresh_from_db()
         assert tag.name == payload["name"]
 
+    def test_rename_to_existing_tag_rejected(self, auth_client, user):
+        tag, other = test_factory.TagsFactory.create_batch(2, user=user)
+        url = detail_url("tag", tag.id)
+        res = auth_client.patch(url, {'name': other.name})
+        assert res.status_code == 400
+        assert 'name' in res.data
+        tag.refresh_from_db()
+        assert tag.name != other.name
 
     def test_delete_tag(self, auth_client, user):
         tag = test_factory.TagsFactory.create(user=user)
@@ -80,4 +88,11 @@ class TestsTagsWAuth:
         res = auth_client.get(TAGS_URL, {'assigned_only': 1})
         assert len(res.data) == 1
 
-    
\ No newline at end of file
+    def test_fuzzy_tag_lookup(self, auth_client, user):
+        breakfast = test_factory.TagsFactory.create(
+            user=user, name='Breakfast'
+        )
+        test_factory.TagsFactory.create(user=user, name='Dinner')
+        res = auth_client.get(TAGS_URL, {'fuzzy': 'brekfast'})
+        assert res.status_code == 200
+        assert [tag['id'] for tag in res.data] == [breakfast.id]
@@ -1,7 +1,18 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 from core.tests import test_factory
 from core import models
+from user import hashing
+from user.authentication import user_cache
+from user.revocation import revocation_list
 
 
 import pytest
@@ -31,6 +42,19 @@ class TestPublicUserApi:
         assert user.check_password(payload["password"])
         assert 'password' not in res.data
 
+    def test_create_user_normalizes_email(self, api_client):
+        payload = {
+            'email': 'test@EXAMPLE.com',
+            'password': '123123123',
+            'name': 'test user',
+        }
+
+        res = api_client.post(CREATE_USER_URL, payload)
+        assert res.status_code == 201
+
+        user = get_user_model().objects.get(email='test@example.com')
+        assert user.check_password(payload['password'])
+
     def test_user_with_email_exists_error(self, api_client):
         payload = {
             'email': 'test@example.com',
@@ -109,3 +133,201 @@ class TestPrivateUserApi:
         assert user.name == payload["name"]
         assert user.check_password(payload["password"]) is True
         assert res.status_code == 200
+
+
+class TestCachedJWTAuthentication:
+
+    @pytest.fixture
+    def jwt_client(self, user):
+        client = APIClient()
+        token = RefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def _user_queries(self, context):
+        table = get_user_model()._meta.db_table
+        return [q for q in context.captured_queries if table in q['sql']]
+
+    def test_repeat_requests_reuse_cached_user(self, jwt_client, user):
+        assert jwt_client.get(ME_URL).status_code == 200
+
+        with CaptureQueriesContext(connection) as context:
+            res = jwt_client.get(ME_URL)
+
+        assert res.status_code == 200
+        assert res.data['email'] == user.email
+        assert self._user_queries(context) == []
+
+    def test_profile_update_invalidates_cached_user(self, jwt_client):
+        jwt_client.get(ME_URL)
+        jwt_client.patch(ME_URL, {'name': 'Renamed'})
+
+        res = jwt_client.get(ME_URL)
+
+        assert res.data['name'] == 'Renamed'
+
+    def test_deactivated_user_is_rejected(self, jwt_client, user):
+        assert jwt_client.get(ME_URL).status_code == 200
+
+        user.is_active = False
+        user.save()
+
+        assert jwt_client.get(ME_URL).status_code == 401
+
+    def test_cached_user_expires(self, jwt_client, user, settings):
+        settings.AUTH_USER_CACHE_TTL = 0
+        jwt_client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as context:
+            jwt_client.get(ME_URL)
+
+        assert self._user_queries(context)
+
+    def test_requests_get_their_own_user_instance(self, user):
+        user_cache.set(user.id, user)
+
+        first = user_cache.get(user.id)
+        first.name = 'Changed'
+
+        assert user_cache.get(user.id).name == user.name
+
+
+class TestTokenRevocation:
+    LOGOUT_URL = reverse('user:logout')
+    REFRESH_URL = reverse('user:token_refresh')
+
+    @pytest.fixture
+    def refresh(self, user):
+        return RefreshToken.for_user(user)
+
+    def _client(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def test_logout_revokes_tokens(self, refresh):
+        client = self._client(refresh.access_token)
+
+        res = client.post(self.LOGOUT_URL, {'refresh': str(refresh)})
+
+        assert res.status_code == 204
+        assert client.get(ME_URL).status_code == 401
+        res = APIClient().post(self.REFRESH_URL, {'refresh': str(refresh)})
+        assert res.status_code == 401
+
+    def test_logout_rejects_other_users_refresh_token(self, refresh):
+        other = test_factory.UserFactory()
+        client = self._client(RefreshToken.for_user(other).access_token)
+
+        res = client.post(self.LOGOUT_URL, {'refresh': str(refresh)})
+
+        assert res.status_code == 400
+        assert not models.RevokedToken.objects.exists()
+
+    def test_refresh_rotates_refresh_token(self, refresh):
+        client = APIClient()
+
+        res = client.post(self.REFRESH_URL, {'refresh': str(refresh)})
+
+        assert res.status_code == 200
+        assert res.data['refresh'] != str(refresh)
+        reused = client.post(self.REFRESH_URL, {'refresh': str(refresh)})
+        assert reused.status_code == 401
+        rotated = client.post(
+            self.REFRESH_URL, {'refresh': res.data['refresh']}
+        )
+        assert rotated.status_code == 200
+
+    def test_revoked_access_tokens_are_checked_in_memory(self, refresh):
+        client = self._client(refresh.access_token)
+        client.get(ME_URL)
+
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(ME_URL).status_code == 200
+
+        assert context.captured_queries == []
+
+    def test_revocations_from_other_processes_apply_after_sync(self, refresh):
+        token = refresh.access_token
+        client = self._client(token)
+        assert client.get(ME_URL).status_code == 200
+
+        # Recorded without going through this process's revocation list.
+        models.RevokedToken.objects.revoke(
+            token['jti'], timezone.now() + timedelta(minutes=5),
+        )
+        assert client.get(ME_URL).status_code == 200
+
+        revocation_list.sync(force=True)
+        assert client.get(ME_URL).status_code == 401
+
+    def test_expired_revocations_are_pruned_on_sync(self):
+        models.RevokedToken.objects.create(
+            jti='old', expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        revocation_list.sync(force=True)
+
+        assert not models.RevokedToken.objects.filter(jti='old').exists()
+
+    def test_refresh_does_not_prune(self, refresh):
+        revocation_list.sync(force=True)
+        models.RevokedToken.objects.create(
+            jti='old', expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        res = APIClient().post(self.REFRESH_URL, {'refresh': str(refresh)})
+
+        assert res.status_code == 200
+        assert models.RevokedToken.objects.filter(jti='old').exists()
+
+
+class TestPasswordHashing:
+    PASSWORD = 'testpass123'
+
+    @pytest.fixture
+    def md5_user(self, settings):
+        settings.PASSWORD_HASHERS = [
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+            'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]
+        user = test_factory.UserFactory()
+        user.password = make_password(self.PASSWORD, hasher='md5')
+        user.save()
+        return user
+
+    def test_login_upgrades_outdated_hash(self, api_client, md5_user):
+        payload = {'email': md5_user.email, 'password': self.PASSWORD}
+
+        res = api_client.post(TOKEN_URL, payload)
+
+        assert res.status_code == 200
+        md5_user.refresh_from_db()
+        assert md5_user.password.startswith('pbkdf2_sha256$')
+        assert md5_user.check_password(self.PASSWORD)
+
+    def test_failed_login_keeps_hash(self, api_client, md5_user):
+        encoded = md5_user.password
+        payload = {'email': md5_user.email, 'password': 'wrong'}
+
+        res = api_client.post(TOKEN_URL, payload)
+
+        assert res.status_code == 401
+        md5_user.refresh_from_db()
+        assert md5_user.password == encoded
+
+    def test_full_pool_returns_503(self, api_client, user, monkeypatch):
+        busy = hashing.HashingPool(workers=1, queue_size=0)
+        _, slots = busy._start()
+        slots.acquire()
+        monkeypatch.setattr(hashing, 'pool', busy)
+        try:
+            res = api_client.post(
+                TOKEN_URL, {'email': user.email, 'password': self.PASSWORD},
+            )
+        finally:
+            slots.release()
+            busy.shutdown()
+
+        assert res.status_code == 503
+        assert res['Retry-After'] == '1'
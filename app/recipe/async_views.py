@@ -0,0 +1,136 @@
+"""
+Async entry points for the recipe read endpoints.
+
+Under ASGI, Django runs every synchronous view on one shared thread, so a
+process serves a single request at a time no matter how many clients are
+connected. Views built with AsyncReadMixin carry a coroutine variant, which
+the ASGIHandler below serves instead: GET and HEAD requests run the
+unchanged DRF view on a pool of ASYNC_READ_THREADS threads, each with its
+own database connection, while the event loop keeps handling other clients.
+Writes still run on Django's shared thread. Under WSGI the views are plain
+synchronous views, so requests don't pay for an event loop.
+
+Django 3.2 iterates streaming bodies on the event loop, where database
+queries are not allowed, so the handler pulls the export and import streams
+on Django's shared thread instead and sends each slice as it is produced.
+
+Authentication runs inside the offloaded view and only touches thread-safe
+state (the user cache and revocation list lock around their updates).
+"""
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db import close_old_connections
+
+SAFE_METHODS = ('GET', 'HEAD')
+# A streaming body is sent once this many bytes are produced, or once it
+# has been producing for STREAM_FLUSH_INTERVAL seconds.
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_FLUSH_INTERVAL = 0.1
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_READ_THREADS,
+                thread_name_prefix='recipe-read',
+            )
+        return _executor
+
+
+def _read(view, request, *args, **kwargs):
+    # Django only manages connections of the thread handling the request,
+    # so the pool's threads close their own.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_reads(view):
+    """Wrap a synchronous view in a coroutine offloading reads."""
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await sync_to_async(
+                _read, thread_sensitive=False, executor=_get_executor(),
+            )(view, request, *args, **kwargs)
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    return functools.update_wrapper(async_view, view)
+
+
+class AsyncReadMixin:
+    """Give a viewset's views an ``async_reads`` variant for ASGIHandler."""
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        view.async_view = async_reads(view)
+        return view
+
+
+def _next_slice(parts):
+    """Join the next parts of a body, or return None once it is exhausted."""
+    produced = []
+    size = 0
+    deadline = time.monotonic() + STREAM_FLUSH_INTERVAL
+    for part in parts:
+        produced.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE or time.monotonic() >= deadline:
+            break
+    if not produced:
+        return None
+    return b''.join(produced)
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Django's ASGI handler, serving the async variants of views."""
+
+    def resolve_request(self, request):
+        match = super().resolve_request(request)
+        view = getattr(match.func, 'async_view', match.func)
+        return view, match.args, match.kwargs
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        parts = iter(response)
+        # Django sends the headers and the closing message, the body is
+        # sent in between.
+        response.streaming_content = ()
+
+        async def send_body(message):
+            if message['type'] == 'http.response.body':
+                await self._send_parts(parts, send)
+            await send(message)
+
+        await super().send_response(response, send_body)
+
+    async def _send_parts(self, parts, send):
+        next_slice = sync_to_async(_next_slice, thread_sensitive=True)
+        while True:
+            body = await next_slice(parts)
+            if body is None:
+                return
+            for chunk, _ in self.chunk_bytes(body):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
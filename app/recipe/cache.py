@@ -0,0 +1,77 @@
+"""
+Response cache for anonymous recipe reads.
+
+Cached entries are keyed by a version token: one for every recipe list and
+one per recipe detail. Writes replace the affected tokens once their
+transaction commits, which orphans the stale entries without having to
+enumerate them.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import urlencode
+
+LIST_VERSION_KEY = 'recipe:list:version'
+
+
+def _cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _detail_version_key(recipe_id):
+    return f'recipe:detail:{recipe_id}:version'
+
+
+def _version(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def request_variant(request):
+    """Hash everything besides the version that changes the response."""
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    variant = '|'.join([
+        request.scheme,
+        request.get_host(),
+        request.META.get('HTTP_ACCEPT', ''),
+        urlencode(params, doseq=True),
+    ])
+    return hashlib.sha1(variant.encode()).hexdigest()
+
+
+def list_key(request):
+    version = _version(LIST_VERSION_KEY)
+    return f'recipe:list:{version}:{request_variant(request)}'
+
+
+def detail_key(request, recipe_id):
+    version = _version(_detail_version_key(recipe_id))
+    return f'recipe:detail:{recipe_id}:{version}:{request_variant(request)}'
+
+
+def get_response_data(key):
+    return _cache().get(key)
+
+
+def set_response_data(key, data):
+    _cache().set(key, data)
+
+
+def invalidate_recipes(recipe_ids=()):
+    """Drop every cached list and the details of ``recipe_ids`` on commit."""
+    keys = [LIST_VERSION_KEY]
+    keys += [_detail_version_key(recipe_id) for recipe_id in recipe_ids]
+
+    def bump_versions():
+        _cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    transaction.on_commit(bump_versions)
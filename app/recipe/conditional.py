@@ -0,0 +1,82 @@
+"""
+Validators for conditional GETs on recipe resources.
+
+Validators are derived from an indexed aggregate over ``updated_at`` instead
+of the rendered body, so a request whose validators still match is answered
+with 304 before anything is serialized.
+"""
+import calendar
+import hashlib
+from collections import namedtuple
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from recipe.cache import request_variant
+
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+
+def _etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def list_validators(request, queryset, *extra):
+    """Validators for a list: its latest ``updated_at`` and row count.
+
+    Deleting a row can leave the latest timestamp unchanged, so lists only
+    get an ETag (which also covers the count) and no Last-Modified.
+    """
+    if queryset.query.is_sliced:
+        # Top-N results (fuzzy lookups) can't be aggregated directly.
+        queryset = queryset.model._default_manager.filter(
+            pk__in=queryset.values('pk')
+        )
+    stats = queryset.order_by().aggregate(
+        last=Max('updated_at'), count=Count('pk'),
+    )
+    etag = _etag(
+        stats['last'], stats['count'], request_variant(request), *extra
+    )
+    return Validators(etag, None)
+
+
+def detail_validators(request, queryset, pk):
+    """Validators for one object, None when it does not exist."""
+    try:
+        updated_at = queryset.filter(pk=pk).values_list(
+            'updated_at', flat=True
+        ).first()
+    except ValueError:
+        return None
+    if updated_at is None:
+        return None
+    return Validators(
+        _etag(pk, updated_at, request_variant(request)), updated_at
+    )
+
+
+def not_modified(request, validators):
+    """Return a 304 response if the client's copy is still current."""
+    last_modified = None
+    if validators.last_modified is not None:
+        last_modified = calendar.timegm(
+            validators.last_modified.utctimetuple()
+        )
+    response = get_conditional_response(
+        request, etag=validators.etag, last_modified=last_modified,
+    )
+    if response is not None:
+        add_headers(response, validators)
+    return response
+
+
+def add_headers(response, validators):
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(
+            calendar.timegm(validators.last_modified.utctimetuple())
+        )
+    return response
@@ -0,0 +1,126 @@
+"""
+Serving of uploaded media.
+
+Stored image names never change meaning: originals are named by their
+content hash and renditions by their original's name, so every response is
+cacheable forever. Files are sent with ``FileResponse``, which lets the
+WSGI server use ``sendfile``, or handed to the front proxy with
+``X-Accel-Redirect`` when ``MEDIA_ACCEL_REDIRECT_PREFIX`` is set.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _RangeFile:
+    """Read at most ``length`` bytes of ``file`` from ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _etag(name):
+    return '"%s"' % hashlib.md5(name.encode()).hexdigest()
+
+
+def _byte_range(request, etag, size):
+    """The requested ``(start, end)`` byte range, None for the whole file.
+
+    Raises ValueError when the range can't be satisfied.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Multiple ranges aren't supported, send the whole file.
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+@require_safe
+def serve(request, name):
+    """Serve the media file ``name`` with long-lived caching headers."""
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404(name)
+    try:
+        size = os.stat(path).st_size
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(name)
+    if not os.path.isfile(path):
+        raise Http404(name)
+
+    etag = _etag(name)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = _file_response(
+            request, name, path, size, etag, content_type,
+        )
+    response['ETag'] = etag
+    response['Cache-Control'] = CACHE_CONTROL
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _file_response(request, name, path, size, etag, content_type):
+    prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        # The proxy sends the file, including any Range, itself.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix + quote(name)
+        return response
+    try:
+        byte_range = _byte_range(request, etag, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(
+        _RangeFile(open(path, 'rb'), start, length),
+        status=206, content_type=content_type,
+    )
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,193 @@
+"""
+Pagination classes for the recipe APIs.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipeCursorPagination(BasePagination):
+    """Keyset pagination over ``(created_at, id)``, newest recipes first.
+
+    Each page is fetched with an indexed range condition on the last row
+    seen instead of an offset, so every page costs the same and rows
+    inserted meanwhile never shift the pages that follow. Pagination only
+    kicks in when the client sends ``cursor`` or ``page_size``; top-N
+    querysets that are already sliced are returned whole.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (self.cursor_query_param not in params
+                and self.page_size_query_param not in params):
+            return None
+        if queryset.query.is_sliced:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            if has_more or reverse:
+                self.next_position = self._position(results[-1])
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self._position(results[0])
+        return results
+
+    def _after(self, position, reverse):
+        created_at, pk = position
+        if reverse:
+            return Q(created_at__gte=created_at) & (
+                Q(created_at__gt=created_at) | Q(id__gt=pk)
+            )
+        return Q(created_at__lte=created_at) & (
+            Q(created_at__lt=created_at) | Q(id__lt=pk)
+        )
+
+    def _position(self, recipe):
+        return recipe.created_at, recipe.pk
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(payload['c'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), reverse
+
+    def encode_cursor(self, position, reverse=False):
+        created_at, pk = position
+        payload = {'c': created_at.isoformat(), 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor from next/previous.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of recipes per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class RankedSearchPagination(LimitOffsetPagination):
+    """Offset pagination for search results, which are ordered by rank.
+
+    A rank is no key to resume from, so ranked pages are addressed with
+    ``offset`` and ``page_size`` rather than a cursor, and a cursor is
+    rejected. As with the cursor pagination, results are only paginated
+    when the client asks for a page.
+    """
+    limit_query_param = 'page_size'
+    default_limit = RecipeCursorPagination.page_size
+    max_limit = RecipeCursorPagination.max_page_size
+    cursor_query_param = RecipeCursorPagination.cursor_query_param
+    cursor_not_allowed_message = (
+        'Search results are paginated with offset, not cursor.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param in params:
+            raise ValidationError(
+                {self.cursor_query_param: [self.cursor_not_allowed_message]}
+            )
+        if (self.limit_query_param not in params
+                and self.offset_query_param not in params):
+            return None
+        if queryset.query.is_sliced:
+            return None
+        return super().paginate_queryset(queryset, request, view)
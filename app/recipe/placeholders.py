@@ -0,0 +1,94 @@
+"""
+Tiny image placeholders, rendered by clients before the image loads.
+
+Placeholders are BlurHash strings (https://blurha.sh), a couple of dozen
+characters encoding the image's colour layout, plus its average colour.
+"""
+import math
+
+from PIL import Image
+
+BASE83 = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+    '#$%*+,-.:;=?@[]^_{|}~'
+)
+# Horizontal and vertical components, 4x3 encodes to 28 characters.
+COMPONENTS = (4, 3)
+# The image is sampled at this size, more detail doesn't change the hash.
+SAMPLE_SIZE = (32, 32)
+
+
+def _base83(value, length):
+    return ''.join(
+        BASE83[value // 83 ** (length - i) % 83] for i in range(1, length + 1)
+    )
+
+
+def _to_linear(value):
+    value /= 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def _to_srgb(value):
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, components=COMPONENTS):
+    """Return ``(hash, '#rrggbb' average colour)`` of a Pillow image."""
+    sample = image.convert('RGB')
+    sample.thumbnail(SAMPLE_SIZE, Image.BILINEAR)
+    width, height = sample.size
+    linear = [
+        tuple(_to_linear(channel) for channel in pixel)
+        for pixel in sample.getdata()
+    ]
+    x_components, y_components = components
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == j == 0 else 2
+            totals = [0.0, 0.0, 0.0]
+            for y in range(height):
+                y_basis = math.cos(math.pi * j * y / height)
+                for x in range(width):
+                    basis = (normalisation * y_basis
+                             * math.cos(math.pi * i * x / width))
+                    pixel = linear[y * width + x]
+                    for channel in range(3):
+                        totals[channel] += basis * pixel[channel]
+            factors.append([total / (width * height) for total in totals])
+
+    dc, ac = factors[0], factors[1:]
+    encoded = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        encoded += _base83(quantised_max, 1)
+    else:
+        max_value = 1
+        encoded += _base83(0, 1)
+
+    red, green, blue = (_to_srgb(value) for value in dc)
+    encoded += _base83((red << 16) + (green << 8) + blue, 4)
+    for factor in ac:
+        red, green, blue = (
+            max(0, min(18, int(_sign_pow(value / max_value, 0.5) * 9 + 9.5)))
+            for value in factor
+        )
+        encoded += _base83(red * 19 * 19 + green * 19 + blue, 2)
+    return encoded, '#%02x%02x%02x' % _average_colour(sample)
+
+
+def _average_colour(image):
+    return image.resize((1, 1), Image.BOX).getpixel((0, 0))[:3]
@@ -0,0 +1,121 @@
+"""
+Downscaled renditions of recipe images.
+
+Renditions are rendered with Pillow by a background job, so decoding and
+resampling large uploads never holds up a request worker. They are written
+next to the original upload as ``<original stem>.<rendition>.jpg`` and
+their storage names are recorded on ``Recipe.image_renditions`` once
+rendered, along with a placeholder computed from the thumbnail. Originals
+are stored by content, so renditions are rendered once per distinct image.
+"""
+import os
+
+from django.utils import timezone
+from PIL import Image
+
+from core import jobs
+from recipe import placeholders
+
+# Bounding boxes, the aspect ratio is preserved and images never upscaled.
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+RENDITION_QUALITY = 82
+
+
+def rendition_name(image_name, rendition):
+    stem, _ext = os.path.splitext(image_name)
+    return f'{stem}.{rendition}.jpg'
+
+
+def render(path, renditions=RENDITIONS):
+    """Write every rendition of the image at ``path``.
+
+    Only deals with file paths. Returns the rendition paths by rendition
+    name.
+    """
+    paths = {}
+    with Image.open(path) as original:
+        original.draft('RGB', max(renditions.values()))
+        image = original.convert('RGBA')
+    flattened = Image.new('RGB', image.size, 'white')
+    flattened.paste(image, mask=image.getchannel('A'))
+    for rendition, size in renditions.items():
+        resized = flattened.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        paths[rendition] = rendition_name(path, rendition)
+        resized.save(
+            paths[rendition], 'JPEG',
+            quality=RENDITION_QUALITY, optimize=True, progressive=True,
+        )
+    return paths
+
+
+def process(path):
+    """Render the image at ``path`` and return its placeholder fields."""
+    paths = render(path)
+    return placeholder(paths['thumbnail'])
+
+
+def placeholder(thumbnail_path):
+    with Image.open(thumbnail_path) as thumbnail:
+        image_blurhash, image_color = placeholders.blurhash(thumbnail)
+    return {'image_blurhash': image_blurhash, 'image_color': image_color}
+
+
+def _store(recipe_id, image_name, fields):
+    from core.models import Recipe
+    from recipe import cache as recipe_cache
+
+    renditions = {
+        rendition: rendition_name(image_name, rendition)
+        for rendition in RENDITIONS
+    }
+    # The image may have been replaced while rendering.
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_renditions=renditions, updated_at=timezone.now(), **fields
+    )
+    if updated:
+        recipe_cache.invalidate_recipes([recipe_id])
+
+
+def pending_fields(image):
+    """Image fields of a recipe given the uploaded ``image``.
+
+    Renditions and the placeholder are cleared until they are rendered,
+    the dimensions come from the upload's header.
+    """
+    width, height = getattr(image, 'image_dimensions', (None, None))
+    return {
+        'image_renditions': {},
+        'image_blurhash': '',
+        'image_color': '',
+        'image_width': width,
+        'image_height': height,
+    }
+
+
+def render_recipe_image(recipe_id, image_name):
+    """Job rendering a recipe's image and recording the results."""
+    from core.models import Recipe
+
+    path = Recipe._meta.get_field('image').storage.path(image_name)
+    # Images are stored by content, so renditions left by an identical
+    # upload can be reused as they are.
+    if all(os.path.exists(rendition_name(path, rendition))
+           for rendition in RENDITIONS):
+        fields = placeholder(rendition_name(path, 'thumbnail'))
+    else:
+        fields = process(path)
+    _store(recipe_id, image_name, fields)
+
+
+def generate(recipe):
+    """Queue rendering of ``recipe``'s image."""
+    if recipe.image:
+        jobs.enqueue(
+            render_recipe_image,
+            recipe_id=recipe.pk, image_name=recipe.image.name,
+        )
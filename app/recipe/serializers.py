@@ -1,21 +1,82 @@
+import itertools
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from rest_framework.fields import ImageField
-from rest_framework.exceptions import ValidationError
 from core.models import (
     Recipe,
     Tag,
     Ingredient,
     Like
 )
+from core.storage import content_hash
+from recipe.uploads import png_dimensions
+
+
+def image_rendition_urls(recipe, request=None):
+    urls = {}
+    for rendition, name in recipe.image_renditions.items():
+        url = recipe.image.storage.url(name)
+        urls[rendition] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+class PNGImageField(serializers.FileField):
+    """PNG upload, validated from its header without decoding it.
+
+    The dimensions are set on the file as ``image_dimensions``.
+    """
+    default_error_messages = {
+        'invalid_image': 'Only PNG images are allowed.',
+        'too_large': (
+            'Image dimensions must not exceed {max_dimension} pixels.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        dimensions = None
+        if file.name.lower().endswith('.png'):
+            dimensions = png_dimensions(file)
+        if not dimensions or not all(dimensions):
+            self.fail('invalid_image')
+        max_dimension = settings.RECIPE_IMAGE_MAX_DIMENSION
+        if max(dimensions) > max_dimension:
+            self.fail('too_large', max_dimension=max_dimension)
+        file.image_dimensions = dimensions
+        content_hash(file)
+        return file
+
+
+class UniqueNameMixin:
+    """Reject renaming an object to a name its owner already uses."""
+
+    def validate_name(self, value):
+        # Nested in a recipe, a known name refers to the existing object.
+        if self.parent is not None:
+            return value
+        model = self.Meta.model
+        others = model.objects.filter(
+            user=self.context['request'].user, name=value
+        )
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError(
+                f'You already have a {model._meta.verbose_name} '
+                f'with this name.'
+            )
+        return value
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UniqueNameMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(UniqueNameMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
@@ -34,45 +95,162 @@ class LikeSerializerWithoutRequest(serializers.ModelSerializer):
         read_only_fields = ['user']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """Create many recipes with a constant number of queries."""
+
+    @transaction.atomic
+    def create(self, validated_data):
+        related = {'tags': Tag, 'ingredients': Ingredient}
+        items = {
+            relation: [data.pop(relation, []) for data in validated_data]
+            for relation in related
+        }
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**data) for data in validated_data]
+        )
+        for relation, model in related.items():
+            objs = {
+                obj.name: obj
+                for obj in self.child._resolve_by_name(
+                    model, itertools.chain.from_iterable(items[relation])
+                )
+            }
+            self.child._link_related(relation, [
+                (recipe, objs[item['name']])
+                for recipe, recipe_items in zip(recipes, items[relation])
+                for item in recipe_items
+            ])
+        return recipes
+
+
+class ImageRenditionsMixin(serializers.Serializer):
+    """Render the URLs of a recipe image's renditions as ``renditions``."""
+    renditions = serializers.SerializerMethodField()
+
+    def get_renditions(self, obj):
+        """URLs of the image's downscaled renditions, once rendered."""
+        return image_rendition_urls(obj, self.context.get('request'))
+
+
+class RecipeSerializer(ImageRenditionsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
-    image = ImageField(required=False)
+    image = PNGImageField(required=False)
 
     class Meta:
         model = Recipe
-        fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients', 'created_at', 'likes_count', 'image']
-        read_only_fields = ['id', 'created_at', 'likes_count']
+        fields = [
+            'id',
+            'title',
+            'time_minutes',
+            'price',
+            'link',
+            'tags',
+            'ingredients',
+            'created_at',
+            'likes_count',
+            'image',
+            'renditions',
+            'image_width',
+            'image_height',
+            'image_blurhash',
+            'image_color',
+        ]
+        read_only_fields = [
+            'id',
+            'created_at',
+            'likes_count',
+            'renditions',
+            'image_width',
+            'image_height',
+            'image_blurhash',
+            'image_color',
+        ]
+        prefetch_related_fields = ['tags', 'ingredients']
+        list_serializer_class = RecipeListSerializer
 
-    def validate_image(self, value):
-        """
-        Check the  uploaded image is in PNG.
-        """
-        if not value.name.lower().endswith('.png'):
-            raise ValidationError("Only PNG images are allowed.")
-        return value
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Prefetch the relations rendered by this serializer."""
+        return queryset.prefetch_related(*cls.Meta.prefetch_related_fields)
 
-    def get_likes_count(self, obj):
-        return obj.likes_count.count()
+    def _resolve_by_name(self, model, items):
+        """Return the user's objects named in ``items``.
 
-    def _get_or_create_tags(self, tags, recipe):
+        Names the user has no object for yet are created.
+        """
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        names = list(dict.fromkeys(item['name'] for item in items))
+        if not names:
+            return []
+        objs = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [name for name in names if name not in objs]
+        if missing:
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True,
             )
-            recipe.tags.add(tag_obj)
+            created = model.objects.filter(user=auth_user, name__in=missing)
+            objs.update((obj.name, obj) for obj in created)
+        return [objs[name] for name in names]
+
+    def _add_related(self, recipe, relation, objs):
+        """Link ``objs`` to ``recipe`` with a single insert."""
+        self._link_related(relation, [(recipe, obj) for obj in objs])
+
+    def _link_related(self, relation, links):
+        """Insert ``(recipe, obj)`` pairs into the through table at once."""
+        if not links:
+            return
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        through.objects.bulk_create(
+            [
+                through(**{source: recipe.pk, target: obj.pk})
+                for recipe, obj in links
+            ],
+            ignore_conflicts=True,
+        )
+
+    def _set_related(self, recipe, relation, objs):
+        """Make ``objs`` the recipe's related set, writing only the delta.
+
+        Return True when the set changed.
+        """
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        wanted = {obj.pk for obj in objs}
+        current = set(
+            through.objects.filter(**{source: recipe.pk})
+            .values_list(target, flat=True)
+        )
+        stale = current - wanted
+        if stale:
+            through.objects.filter(
+                **{source: recipe.pk, f'{target}__in': stale}
+            ).delete()
+        added = [obj for obj in objs if obj.pk not in current]
+        self._add_related(recipe, relation, added)
+        getattr(recipe, '_prefetched_objects_cache', {}).pop(relation, None)
+        return bool(stale or added)
+
+    def _get_or_create_tags(self, tags, recipe):
+        self._add_related(recipe, 'tags', self._resolve_by_name(Tag, tags))
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ing_obj, created = Ingredient.objects.get_or_create(
-                user = auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ing_obj)
+        self._add_related(
+            recipe, 'ingredients',
+            self._resolve_by_name(Ingredient, ingredients),
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
@@ -81,19 +259,29 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update recipe."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
+        related_changed = False
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            related_changed |= self._set_related(
+                instance, 'tags', self._resolve_by_name(Tag, tags)
+            )
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+            related_changed |= self._set_related(
+                instance, 'ingredients',
+                self._resolve_by_name(Ingredient, ingredients),
+            )
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+        if changed or related_changed:
+            instance.save(update_fields=changed + ['updated_at'])
         return instance
 
 
@@ -102,3 +290,27 @@ class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ["description"]
 
+
+class RecipeImageSerializer(ImageRenditionsMixin,
+                            serializers.ModelSerializer):
+    image = PNGImageField(required=True)
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'id',
+            'image',
+            'renditions',
+            'image_width',
+            'image_height',
+            'image_blurhash',
+            'image_color',
+        ]
+        read_only_fields = [
+            'id',
+            'renditions',
+            'image_width',
+            'image_height',
+            'image_blurhash',
+            'image_color',
+        ]
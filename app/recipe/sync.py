@@ -0,0 +1,117 @@
+"""
+Change feed for incremental client sync.
+
+Recipes, tags, ingredients and tombstones get a ``change_txid`` (writing
+transaction) and a global ``change_seq`` from the core_change_seq trigger
+on every insert and update. Sequence values are handed out before commit,
+so a feed ordered by them alone would skip rows whose transaction commits
+after a client has read past them.
+
+The cursor therefore carries a transaction floor: every transaction older
+than the floor had finished when the sync round started, so a round reads
+all rows written by transactions at or after the floor, in
+``(change_txid, change_seq)`` order. When the round is exhausted the next
+floor is the oldest transaction still running when the round began. A row
+may be sent twice across rounds, but never skipped.
+"""
+import base64
+import binascii
+import json
+
+from django.db import connections
+from django.db.models import Q
+
+from core.models import Ingredient, Recipe, Tag, Tombstone
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Cursor:
+    """Sync position: a transaction floor, the last row read and the floor
+    of the following round."""
+
+    def __init__(self, floor=0, position=None, next_floor=None):
+        self.floor = floor
+        self.position = position
+        self.next_floor = next_floor
+
+    @classmethod
+    def decode(cls, encoded):
+        if not encoded:
+            return cls()
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = payload.get('p')
+            if position is not None:
+                position = (int(position[0]), int(position[1]))
+            next_floor = payload.get('n')
+            return cls(
+                int(payload['f']), position,
+                None if next_floor is None else int(next_floor),
+            )
+        except (TypeError, ValueError, KeyError, IndexError, AttributeError,
+                binascii.Error):
+            raise InvalidCursor(encoded)
+
+    def encode(self):
+        payload = {'f': self.floor}
+        if self.position is not None:
+            payload['p'] = list(self.position)
+        if self.next_floor is not None:
+            payload['n'] = self.next_floor
+        return base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode()
+        ).decode()
+
+
+def current_floor(using='default'):
+    """The oldest transaction still in progress."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def _after(queryset, cursor):
+    queryset = queryset.filter(change_txid__gte=cursor.floor)
+    if cursor.position is not None:
+        txid, seq = cursor.position
+        queryset = queryset.filter(
+            Q(change_txid__gt=txid) | Q(change_txid=txid, change_seq__gt=seq)
+        )
+    return queryset.order_by('change_txid', 'change_seq')
+
+
+def changes(user, cursor, limit, recipes=None):
+    """Return ``(rows, next_cursor, has_more)`` for one page of the feed.
+
+    ``rows`` is a list of ``(kind, obj)`` in feed order, where ``obj`` is a
+    Recipe, Tag, Ingredient or Tombstone.
+    """
+    if cursor.next_floor is None:
+        cursor = Cursor(cursor.floor, cursor.position, current_floor())
+    sources = [
+        ('recipe', Recipe.objects.all() if recipes is None else recipes),
+        ('tag', Tag.objects.filter(user=user)),
+        ('ingredient', Ingredient.objects.filter(user=user)),
+        ('deleted', Tombstone.objects.filter(
+            Q(kind=Tombstone.RECIPE) | Q(user=user)
+        )),
+    ]
+    rows = []
+    for kind, queryset in sources:
+        rows += [(kind, obj) for obj in _after(queryset, cursor)[:limit + 1]]
+    rows.sort(key=lambda row: (row[1].change_txid, row[1].change_seq))
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        last = rows[-1][1]
+        next_cursor = Cursor(
+            cursor.floor, (last.change_txid, last.change_seq),
+            cursor.next_floor,
+        )
+    else:
+        next_cursor = Cursor(cursor.next_floor)
+    return rows, next_cursor, has_more
@@ -16,6 +16,7 @@ router.register('recipes', views.RecipeViewSet, basename="recipe")
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('likes', views.LikeViewSet)
+router.register('changes', views.ChangesViewSet, basename='changes')
 
 
 app_name = 'recipe'
@@ -1,4 +1,18 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+import csv
+import itertools
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Max
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -11,23 +25,57 @@ from rest_framework import (viewsets,
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from user.authentication import CachedJWTAuthentication
 
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.pagination import LimitOffsetPagination, _positive_int
 
 from core.models import (
+    RECIPE_SEARCH_CONFIG,
     Recipe,
     Tag,
     Ingredient,
-    Like
+    Like,
+    Tombstone,
+)
+from recipe import cache as recipe_cache
+from recipe import conditional, renditions, serializers, sync, uploads
+from recipe.async_views import AsyncReadMixin
+from recipe.pagination import RankedSearchPagination, RecipeCursorPagination
+
+
+FUZZY_PARAMETER = OpenApiParameter(
+    'fuzzy',
+    OpenApiTypes.STR,
+    description=(
+        'Typo tolerant name lookup. Returns the closest matches ordered by '
+        'trigram similarity.'
+    ),
+    required=False,
 )
-from recipe import serializers
+
+
+class FuzzyMatchMixin:
+    """Similarity ranked, typo tolerant lookup on ``fuzzy_field``."""
+    fuzzy_field = 'name'
+    fuzzy_limit = 10
+
+    def _fuzzy_match(self, queryset):
+        term = self.request.query_params.get('fuzzy')
+        if not term or self.action != 'list':
+            return queryset
+        field = self.fuzzy_field
+        queryset = queryset.filter(**{f'{field}__trigram_similar': term})
+        queryset = queryset.annotate(
+            similarity=TrigramSimilarity(field, term),
+        ).order_by('-similarity', field)
+        return queryset[:self.fuzzy_limit]
 
 
 @extend_schema_view(
     list=extend_schema(
         parameters=[
+            FUZZY_PARAMETER,
             OpenApiParameter(
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
@@ -48,12 +96,14 @@ from recipe import serializers
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(AsyncReadMixin,
+                            FuzzyMatchMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet
                             ):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     pagination_class = LimitOffsetPagination
 
@@ -69,16 +119,78 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         queryset =  queryset.filter(
             user=self.request.user
         ).order_by('-name').distinct()
-        return queryset
+        return self._fuzzy_match(queryset)
+
+    def list(self, request, *args, **kwargs):
+        validators = conditional.list_validators(
+            request, self.get_queryset(), request.user.pk,
+            *self._assigned_recipes_state(),
+        )
+        response = conditional.not_modified(request, validators)
+        if response is not None:
+            return response
+        response = super().list(request, *args, **kwargs)
+        return conditional.add_headers(response, validators)
+
+    def _assigned_recipes_state(self):
+        # assigned_only results change when recipes are relinked, which
+        # bumps the recipes' updated_at but not the items'.
+        if not int(self.request.query_params.get('assigned_only', 0)):
+            return ()
+        stats = Recipe.objects.filter(user=self.request.user).aggregate(
+            last=Max('updated_at'), count=Count('pk'),
+        )
+        return stats['last'], stats['count']
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self._touch_recipes(self._recipe_ids(serializer.instance))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        recipe_ids = self._recipe_ids(instance)
+        Tombstone.objects.record([instance])
+        super().perform_destroy(instance)
+        self._touch_recipes(recipe_ids)
+
+    def _touch_recipes(self, recipe_ids):
+        """Mark recipes rendering this item as changed."""
+        if recipe_ids:
+            Recipe.objects.filter(id__in=recipe_ids).update(
+                updated_at=timezone.now()
+            )
+        recipe_cache.invalidate_recipes(recipe_ids)
+
+    def _recipe_ids(self, instance):
+        return list(instance.recipe_set.values_list('id', flat=True))
 
 @extend_schema_view(
     list=extend_schema(
         parameters=[
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description=(
+                    'Full-text search over title and description, ranked '
+                    'by relevance. Supports quoted phrases, "or" and '
+                    '"-word" exclusions. Results are paginated with offset '
+                    'and page_size instead of cursor.'
+                ),
+                required=False,
+            ),
+            OpenApiParameter(
+                'offset',
+                OpenApiTypes.INT,
+                description='Starting index of a page of search results.',
+                required=False,
+            ),
+            FUZZY_PARAMETER,
             OpenApiParameter(
                 'title',
                 OpenApiTypes.STR,
-                description='Query by name',
+                description='Deprecated alias of search.',
                 required=False,
+                deprecated=True,
             ),
             OpenApiParameter(
                 'created_at',
@@ -99,22 +211,47 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         ]
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AsyncReadMixin, FuzzyMatchMixin, viewsets.ModelViewSet):
     """View for manage recipe APIs."""
+    fuzzy_field = 'title'
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = RecipeCursorPagination
+    import_batch_size = 500
+    import_max_batch_size = 5000
+    export_chunk_size = 2000
+    export_fields = [
+        'id', 'title', 'description', 'time_minutes', 'price', 'link',
+        'created_at', 'likes_count', 'image',
+    ]
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Uploaded images go straight to disk, capped and hashed on the way.
+        request.upload_handlers = [uploads.BoundedUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    @property
+    def paginator(self):
+        # Ranked results have no stable key for the cursor to resume from.
+        if not hasattr(self, '_paginator') and self._search_terms():
+            self._paginator = RankedSearchPagination()
+        return super().paginator
 
     def _params_to_ints(self, qs):
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _search_terms(self):
+        return (self.request.query_params.get('search')
+                or self.request.query_params.get('title'))
+
     def get_queryset(self):
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
         created_at = self.request.query_params.get('created_at')
         likes_count = self.request.query_params.get('likes_count')
-        title = self.request.query_params.get('title')
+        search = self._search_terms()
 
         queryset = self.queryset
         if tags:
@@ -127,10 +264,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(created_at=created_at)
         if likes_count:
             queryset = queryset.filter(likes_count=likes_count)
-        if title:
-            queryset = queryset.filter(title__icontains=title)
+        if search:
+            queryset = self._search(queryset, search)
+        queryset = self._setup_eager_loading(queryset)
 
-        return queryset
+        return self._fuzzy_match(queryset)
+
+    def _search(self, queryset, search):
+        query = SearchQuery(
+            search, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query),
+        ).order_by('-rank', '-created_at', '-id')
+
+    def _setup_eager_loading(self, queryset):
+        serializer_class = self.get_serializer_class()
+        setup = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup is None:
+            return queryset
+        return setup(queryset)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -139,20 +292,280 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeImageSerializer
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(
+            recipe_cache.list_key,
+            lambda request: conditional.list_validators(
+                request, self.get_queryset()
+            ),
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(
+            lambda request: recipe_cache.detail_key(request, kwargs['pk']),
+            lambda request: conditional.detail_validators(
+                request, self.queryset, kwargs['pk']
+            ),
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _conditional_response(self, make_key, make_validators, view,
+                              request, *args, **kwargs):
+        """Answer reads with a 304 or from the cache before rendering."""
+        key = make_key(request) if request.user.is_anonymous else None
+        cached = recipe_cache.get_response_data(key) if key else None
+        if cached is not None:
+            validators, data = cached
+            response = conditional.not_modified(request, validators)
+            if response is None:
+                response = conditional.add_headers(Response(data), validators)
+            return response
+
+        validators = make_validators(request)
+        if validators is None:
+            return view(request, *args, **kwargs)
+        response = conditional.not_modified(request, validators)
+        if response is not None:
+            return response
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            conditional.add_headers(response, validators)
+            if key:
+                recipe_cache.set_response_data(
+                    key, (validators, response.data)
+                )
+        return response
+
     def perform_create(self, serializer):
-        recipe = serializer.save(user=self.request.user)
+        recipe = serializer.save(
+            user=self.request.user, **self._image_fields(serializer)
+        )
+        if recipe.image:
+            renditions.generate(recipe)
+        recipe_cache.invalidate_recipes()
         return recipe
 
+    def perform_update(self, serializer):
+        image_fields = self._image_fields(serializer)
+        serializer.save(**image_fields)
+        if image_fields:
+            renditions.generate(serializer.instance)
+        recipe_cache.invalidate_recipes([serializer.instance.pk])
+
+    def _image_fields(self, serializer):
+        image = serializer.validated_data.get('image')
+        return renditions.pending_fields(image) if image else {}
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        recipe_id = instance.pk
+        Tombstone.objects.record([instance])
+        super().perform_destroy(instance)
+        recipe_cache.invalidate_recipes([recipe_id])
+
+    @extend_schema(
+        request={'application/x-ndjson': serializers.RecipeDetailSerializer},
+        parameters=[
+            OpenApiParameter(
+                'batch_size',
+                OpenApiTypes.INT,
+                description='Number of recipes written per transaction.',
+                required=False,
+            ),
+        ],
+        description=(
+            'Import recipes from a newline delimited JSON body, one recipe '
+            'per line. Streams back one NDJSON result per input line.'
+        ),
+    )
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='import',
+        permission_classes=[IsAuthenticated],
+    )
+    def import_recipes(self, request):
+        """Bulk import recipes from a streamed NDJSON body."""
+        batch_size = self._import_batch_size(request)
+        results = self._import_lines(request, batch_size)
+        return StreamingHttpResponse(
+            (json.dumps(result) + '\n' for result in results),
+            content_type='application/x-ndjson',
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'output',
+                OpenApiTypes.STR,
+                enum=['ndjson', 'csv'],
+                description='Export format, ndjson by default.',
+                required=False,
+            ),
+        ],
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR},
+        description="Stream all of the authenticated user's recipes.",
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+    )
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV."""
+        output = request.query_params.get('output', 'ndjson')
+        if output == 'ndjson':
+            lines = (
+                json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+                for row in self._export_rows(request.user)
+            )
+            content_type = 'application/x-ndjson'
+        elif output == 'csv':
+            lines = self._export_csv(self._export_rows(request.user))
+            content_type = 'text/csv'
+        else:
+            return Response(
+                {'output': ['Must be one of ndjson, csv.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{output}"'
+        )
+        return response
+
+    def _export_rows(self, user):
+        # Rows come from a server-side cursor; related names are fetched
+        # once per chunk so memory stays flat however many recipes there are.
+        rows = Recipe.objects.filter(user=user).order_by('id').values_list(
+            *self.export_fields
+        ).iterator(chunk_size=self.export_chunk_size)
+        while True:
+            chunk = list(itertools.islice(rows, self.export_chunk_size))
+            if not chunk:
+                return
+            ids = [row[0] for row in chunk]
+            tags = self._export_related_names('tags', ids)
+            ingredients = self._export_related_names('ingredients', ids)
+            for row in chunk:
+                recipe = dict(zip(self.export_fields, row))
+                recipe['tags'] = tags.get(recipe['id'], [])
+                recipe['ingredients'] = ingredients.get(recipe['id'], [])
+                yield recipe
+
+    def _export_related_names(self, relation, recipe_ids):
+        field = Recipe._meta.get_field(relation)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        links = field.remote_field.through.objects.filter(
+            **{f'{source}_id__in': recipe_ids}
+        ).order_by(f'{target}__name').values_list(
+            f'{source}_id', f'{target}__name'
+        )
+        names = {}
+        for recipe_id, name in links:
+            names.setdefault(recipe_id, []).append(name)
+        return names
+
+    def _export_csv(self, rows):
+        buffer = _EchoBuffer()
+        writer = csv.writer(buffer)
+        columns = self.export_fields + ['tags', 'ingredients']
+        yield writer.writerow(columns)
+        for row in rows:
+            row['tags'] = ';'.join(row['tags'])
+            row['ingredients'] = ';'.join(row['ingredients'])
+            yield writer.writerow([row[column] for column in columns])
+
+    def _import_batch_size(self, request):
+        try:
+            batch_size = int(request.query_params['batch_size'])
+        except (KeyError, ValueError):
+            return self.import_batch_size
+        return max(1, min(batch_size, self.import_max_batch_size))
+
+    def _import_lines(self, request, batch_size):
+        # Results are reported in input order: errors found while
+        # validating wait with the rest of their batch.
+        batch = []
+        lines = request.stream or []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                batch.append((line_number, None, ['Invalid JSON.']))
+            else:
+                serializer = self.get_serializer(data=data)
+                if serializer.is_valid():
+                    entry = (line_number, serializer.validated_data, None)
+                else:
+                    entry = (line_number, None, serializer.errors)
+                batch.append(entry)
+            if len(batch) >= batch_size:
+                yield from self._import_batch(request, batch)
+                batch = []
+        if batch:
+            yield from self._import_batch(request, batch)
+
+    def _import_batch(self, request, batch):
+        valid = [
+            (line_number, dict(data, user=request.user))
+            for line_number, data, errors in batch if errors is None
+        ]
+        saved = self._import_save(valid)
+        if saved is None:
+            # Find the rows at fault by saving them one at a time.
+            saved = {}
+            for line_number, data in valid:
+                saved.update(self._import_save([(line_number, data)]) or {})
+        if saved:
+            recipe_cache.invalidate_recipes()
+
+        for line_number, data, errors in batch:
+            if errors is not None:
+                yield {'line': line_number, 'errors': errors}
+            elif line_number in saved:
+                yield {'line': line_number, 'id': saved[line_number]}
+            else:
+                yield {'line': line_number, 'errors': ['Could not be saved.']}
+
+    def _import_save(self, rows):
+        """Create ``rows`` in one transaction, None if it failed."""
+        if not rows:
+            return {}
+        serializer = self.get_serializer(many=True)
+        try:
+            recipes = serializer.create([data for line_number, data in rows])
+        except DatabaseError:
+            return None
+        return {
+            line_number: recipe.pk
+            for (line_number, data), recipe in zip(rows, recipes)
+        }
+
+    @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(**self._image_fields(serializer))
+            renditions.generate(recipe)
+            recipe_cache.invalidate_recipes([recipe.pk])
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class _EchoBuffer:
+    """File-like object that hands back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
 class TagViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
@@ -162,49 +575,152 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
 
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'since',
+                OpenApiTypes.STR,
+                description=(
+                    'Cursor returned by the previous sync. Omit it for a '
+                    'full sync.'
+                ),
+                required=False,
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of changes per page.',
+                required=False,
+            ),
+        ],
+        description=(
+            'Recipes, tags and ingredients created or modified since the '
+            'cursor, and tombstones of those deleted. Keep requesting with '
+            'the returned cursor while has_more is true.'
+        ),
+    )
+)
+class ChangesViewSet(viewsets.GenericViewSet):
+    """Incremental sync feed for offline clients."""
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.RecipeDetailSerializer
+    queryset = Recipe.objects.all()
+    page_size = 500
+    max_page_size = 1000
+
+    def list(self, request):
+        try:
+            cursor = sync.Cursor.decode(request.query_params.get('since'))
+        except sync.InvalidCursor:
+            return Response(
+                {'since': ['Invalid cursor.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        recipes = self.get_serializer_class().setup_eager_loading(
+            self.get_queryset()
+        )
+        rows, next_cursor, has_more = sync.changes(
+            request.user, cursor, self._limit(request), recipes=recipes,
+        )
+        grouped = {
+            kind: [] for kind in ['recipe', 'tag', 'ingredient', 'deleted']
+        }
+        for kind, obj in rows:
+            grouped[kind].append(obj)
+        return Response({
+            'cursor': next_cursor.encode(),
+            'has_more': has_more,
+            'recipes': self.get_serializer(grouped['recipe'], many=True).data,
+            'tags': serializers.TagSerializer(
+                grouped['tag'], many=True
+            ).data,
+            'ingredients': serializers.IngredientSerializer(
+                grouped['ingredient'], many=True
+            ).data,
+            'deleted': [
+                {'type': tombstone.kind, 'id': tombstone.object_id}
+                for tombstone in grouped['deleted']
+            ],
+        })
+
+    def _limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params['limit'],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+
 class LikeViewSet(mixins.CreateModelMixin,
                   mixins.DestroyModelMixin,
                   viewsets.GenericViewSet
 ):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = serializers.LikeSerializer
     queryset = Like.objects.all()
 
     def create(self, request, *args, **kwargs):
-        recipe_id = request.data.get('recipe')
-        try:
-            recipe = Recipe.objects.get(id=recipe_id)
-        except Recipe.DoesNotExist:
-            return Response({'error': 'Recipe not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        user = request.user  # Get the currently authenticated user
-        like, created = Like.objects.get_or_create(recipe=recipe, user=user)
-        if created:
-            recipe.likes_count.add(like)
-            recipe.save()
-            return Response({'message': 'Recipe liked successfully'}, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'error': 'You have already liked this recipe'}, status=status.HTTP_400_BAD_REQUEST)
+        recipe_id = self._recipe_id(request.data.get('recipe'))
+        if recipe_id is not None:
+            likes_count = Like.objects.like(request.user, recipe_id)
+            if likes_count is not None:
+                recipe_cache.invalidate_recipes([recipe_id])
+                return Response(
+                    {
+                        'message': 'Recipe liked successfully',
+                        'likes_count': likes_count,
+                    },
+                    status=status.HTTP_201_CREATED,
+                )
+        if not self._recipe_exists(recipe_id):
+            return Response(
+                {'error': 'Recipe not found'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(
+            {'error': 'You have already liked this recipe'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
     def destroy(self, request, *args, **kwargs):
-        recipe_id = kwargs['pk']
-        try:
-            recipe = Recipe.objects.get(id=recipe_id)
-        except Recipe.DoesNotExist:
-            return Response({'error': 'Recipe not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        user = request.user
+        recipe_id = self._recipe_id(kwargs['pk'])
+        if recipe_id is not None:
+            likes_count = Like.objects.unlike(request.user, recipe_id)
+            if likes_count is not None:
+                recipe_cache.invalidate_recipes([recipe_id])
+                return Response(
+                    {
+                        'message': 'Recipe like removed successfully',
+                        'likes_count': likes_count,
+                    },
+                    status=status.HTTP_200_OK,
+                )
+        if not self._recipe_exists(recipe_id):
+            return Response(
+                {'error': 'Recipe not found'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(
+            {'error': 'You have not liked this recipe'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
+    def _recipe_id(self, value):
         try:
-            like = Like.objects.get(recipe=recipe, user=user)
-            if like is not None:
-                recipe.likes_count.remove(like)  # Remove the like from the recipe's likes_count relationship
-                like.delete()  # Delete the like object
-                return Response({'message': 'Recipe like removed successfully'}, status=status.HTTP_200_OK)
-            else:
-                # If the like already existed
-                return Response({'error': 'You have not liked this recipe'}, status=status.HTTP_400_BAD_REQUEST)
-        except Like.DoesNotExist:
-            return Response({'error': 'You have not liked this recipe'}, status=status.HTTP_400_BAD_REQUEST)
+            return int(value)
+        except (TypeError, ValueError):
+            return None
 
+    def _recipe_exists(self, recipe_id):
+        # Only reached when the like statement changed nothing.
+        return (
+            recipe_id is not None
+            and Recipe.objects.filter(id=recipe_id).exists()
+        )
@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+
+        from user.authentication import invalidate_user
+
+        def drop_cached_user(sender, instance, **kwargs):
+            invalidate_user(instance)
+
+        for signal in (post_save, post_delete):
+            signal.connect(
+                drop_cached_user, sender=get_user_model(),
+                dispatch_uid=f'user_cache_{signal}',
+            )
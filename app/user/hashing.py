@@ -0,0 +1,156 @@
+"""
+Password hashing in a bounded process pool.
+
+Hashing a password deliberately takes a lot of CPU. Login and signup hand it
+to a pool of PASSWORD_HASH_WORKERS processes, so a burst of logins can't
+occupy every request worker, and reject requests with 503 once
+PASSWORD_HASH_QUEUE_SIZE more are already waiting.
+
+Each worker process starts its own pool, so keep PASSWORD_HASH_WORKERS
+small. The request still waits for its hash, so the limit only comes into
+play with threaded or ASGI workers, which serve several logins at once; a
+synchronous worker never has more than one hash in flight.
+
+Hashers are chosen in the request process and passed to the pool by import
+path, so the pool needs no Django setup.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins at once, try again shortly.')
+    default_code = 'password_hashing_busy'
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        # Sent as Retry-After by the DRF exception handler.
+        self.wait = settings.PASSWORD_HASH_RETRY_AFTER
+
+
+def _hasher_path(hasher):
+    return f'{type(hasher).__module__}.{type(hasher).__qualname__}'
+
+
+def _encode(hasher_path, password, salt):
+    return import_string(hasher_path)().encode(password, salt)
+
+
+def _verify(hasher_path, password, encoded, harden):
+    hasher = import_string(hasher_path)()
+    valid = hasher.verify(password, encoded)
+    if not valid and harden:
+        hasher.harden_runtime(password, encoded)
+    return valid
+
+
+class HashingPool:
+    """A process pool that refuses work instead of queueing without bound."""
+
+    def __init__(self, workers=None, queue_size=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                workers = self.workers or settings.PASSWORD_HASH_WORKERS
+                queue_size = self.queue_size
+                if queue_size is None:
+                    queue_size = settings.PASSWORD_HASH_QUEUE_SIZE
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                self._slots = threading.BoundedSemaphore(workers + queue_size)
+            return self._executor, self._slots
+
+    def run(self, func, *args):
+        executor, slots = self._start()
+        if not slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool:
+            self.shutdown(executor)
+            raise PasswordHashingBusy()
+        finally:
+            slots.release()
+
+    def shutdown(self, executor=None):
+        with self._lock:
+            if self._executor is None:
+                return
+            if executor is not None and executor is not self._executor:
+                return
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+
+
+pool = HashingPool()
+
+
+def make_password(password):
+    """Hash ``password`` with the preferred hasher."""
+    hasher = get_hasher('default')
+    return pool.run(_encode, _hasher_path(hasher), password, hasher.salt())
+
+
+def check_password(password, encoded):
+    """Return ``(valid, must_update)`` for ``password`` against ``encoded``.
+
+    ``must_update`` is set when ``encoded`` doesn't use the preferred hasher
+    and its current parameters.
+    """
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, False
+    preferred = get_hasher('default')
+    must_update = (
+        hasher.algorithm != preferred.algorithm
+        or preferred.must_update(encoded)
+    )
+    harden = must_update and hasher.algorithm == preferred.algorithm
+    valid = pool.run(
+        _verify, _hasher_path(hasher), password, encoded, harden,
+    )
+    return valid, must_update
+
+
+def authenticate(username, password):
+    """Return the user with these credentials, or None.
+
+    Hashes are upgraded to the preferred hasher when the password matches.
+    Unknown users cost a hash as well, so response times don't reveal
+    which accounts exist.
+    """
+    User = get_user_model()
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        make_password(password)
+        return None
+
+    valid, must_update = check_password(password, user.password)
+    if not valid:
+        return None
+    if must_update:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return user
@@ -0,0 +1,109 @@
+"""
+Token revocation checked against an in-process copy of the revoked JTIs.
+
+Revocations are stored in ``core.RevokedToken``. Every process keeps the
+unexpired JTIs in memory and pulls new rows at most once every
+AUTH_REVOCATION_SYNC_INTERVAL seconds, so checking an access token costs a
+set lookup. Revocations made in this process apply immediately, other
+processes enforce them after their next sync. Expired rows are deleted by
+a sync at most once every PRUNE_INTERVAL seconds.
+
+Refresh tokens are always checked against the database when they are used,
+because rotating one has to revoke it exactly once.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from core.models import RevokedToken
+
+# Rows are read again for this long after a sync, to pick up revocations
+# whose transaction committed after that sync ran.
+SYNC_OVERLAP = timedelta(seconds=60)
+# Seconds between deletions of expired revocations by each process.
+PRUNE_INTERVAL = 3600
+
+
+def _expires_at(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+class RevocationList:
+    """The JTIs of unexpired revoked tokens, refreshed periodically."""
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._next_sync = 0
+        self._next_prune = 0
+
+    def is_revoked(self, jti):
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jti in self._revoked
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def sync(self, force=False):
+        with self._lock:
+            if not force and time.monotonic() < self._next_sync:
+                return
+            now = timezone.now()
+            rows = RevokedToken.objects.filter(expires_at__gt=now)
+            if self._synced_at is not None:
+                rows = rows.filter(
+                    revoked_at__gte=self._synced_at - SYNC_OVERLAP
+                )
+            revoked = {
+                jti: expires_at
+                for jti, expires_at in self._revoked.items()
+                if expires_at > now
+            }
+            revoked.update(rows.values_list('jti', 'expires_at'))
+            self._revoked = revoked
+            self._synced_at = now
+            self._next_sync = (
+                time.monotonic() + settings.AUTH_REVOCATION_SYNC_INTERVAL
+            )
+            if time.monotonic() >= self._next_prune:
+                RevokedToken.objects.prune()
+                self._next_prune = time.monotonic() + PRUNE_INTERVAL
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._synced_at = None
+            self._next_sync = 0
+            self._next_prune = 0
+
+
+revocation_list = RevocationList()
+
+
+def is_revoked(token):
+    return revocation_list.is_revoked(token[api_settings.JTI_CLAIM])
+
+
+def revoke(token):
+    """Revoke ``token``, returning False if it was already revoked."""
+    jti = token[api_settings.JTI_CLAIM]
+    expires_at = _expires_at(token)
+    revoked = RevokedToken.objects.revoke(jti, expires_at)
+    revocation_list.add(jti, expires_at)
+    return revoked
+
+
+def use_refresh_token(token):
+    """Check that a refresh token may be used, revoking it if it rotates."""
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        return revoke(token)
+    return not RevokedToken.objects.filter(
+        jti=token[api_settings.JTI_CLAIM]
+    ).exists()
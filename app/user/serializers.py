@@ -5,8 +5,18 @@ from django.contrib.auth import (
     get_user_model,
     authenticate,
 )
+from django.contrib.auth.models import update_last_login
 from django.utils.translation import gettext as _
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from user import hashing
+from user.revocation import revoke, use_refresh_token
 from user.tokens import create_jwt_pair_for_user
 from rest_framework.response import Response
 from rest_framework import status
@@ -22,8 +32,16 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
 
     def create(self, validated_data):
-        """Create and return a user with encrypted password."""
-        return get_user_model().objects.create_user(**validated_data)
+        """Create and return a user with encrypted password.
+
+        The password is hashed in the hashing pool rather than by
+        ``create_user``.
+        """
+        password = validated_data.pop('password')
+        return get_user_model().objects.create_user(
+            encoded_password=hashing.make_password(password),
+            **validated_data,
+        )
 
     def update(self, instance, validated_data):
         """Update and return user."""
@@ -64,4 +82,57 @@ class JWTTokenSerializer(serializers.Serializer):
 
         tokens = create_jwt_pair_for_user(user)
         response = {"message": "Login Successfull", "tokens": tokens}
-        return Response(data=response, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(data=response, status=status.HTTP_200_OK)
+
+
+class PooledTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token serializer checking the password in the hashing pool."""
+
+    def validate(self, attrs):
+        self.user = hashing.authenticate(
+            attrs[self.username_field], attrs['password'],
+        )
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        refresh = self.get_token(self.user)
+        data = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return data
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer rejecting revoked refresh tokens.
+
+    A rotated refresh token is revoked, so it can only be used once.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if not use_refresh_token(refresh):
+            raise InvalidToken(_('Token has been revoked.'))
+        return super().validate(attrs)
+
+
+class LogoutSerializer(serializers.Serializer):
+    """Serializer revoking the user's refresh token."""
+    refresh = serializers.CharField(required=False)
+
+    def validate_refresh(self, value):
+        refresh = RefreshToken(value)
+        user = self.context['request'].user
+        user_id = getattr(user, api_settings.USER_ID_FIELD)
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(user_id):
+            raise serializers.ValidationError(
+                _('Token belongs to another user.'), code='invalid',
+            )
+        return refresh
+
+    def save(self):
+        refresh = self.validated_data.get('refresh')
+        if refresh is not None:
+            revoke(refresh)
@@ -1,18 +1,16 @@
 from django.urls import path
 
 from user import views
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView
-)
+from rest_framework_simplejwt.views import TokenVerifyView
 
 app_name = "user"
 
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name="create"),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/', views.LoginView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', views.RefreshTokenView.as_view(),
+         name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
     path('me/', views.ManageUserView.as_view(), name='me'),
 ]
\ No newline at end of file
@@ -1,12 +1,18 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from user.serializers import (
     UserSerializer,
     JWTTokenSerializer,
+    LogoutSerializer,
+    PooledTokenObtainPairSerializer,
+    RevocableTokenRefreshSerializer,
 )
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from user.authentication import CachedJWTAuthentication
+from user.revocation import revoke
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system."""
@@ -23,8 +29,35 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get_object(self):
         """Retrieve and return the authenticated user."""
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+
+class LoginView(TokenObtainPairView):
+    """Obtain a token pair, checking the password in the hashing pool."""
+    serializer_class = PooledTokenObtainPairSerializer
+
+
+class RefreshTokenView(TokenRefreshView):
+    """Refresh an access token, rotating the refresh token."""
+    serializer_class = RevocableTokenRefreshSerializer
+
+
+class LogoutView(generics.GenericAPIView):
+    """Revoke the access token used and the refresh token passed in."""
+    serializer_class = LogoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        serializer.save()
+        revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)